@@ -1,8 +1,22 @@
 import streamlit as st
 import os
-from utils.parse_controller.parse_points import parse_kml_points
-from utils.main_controller.main_analysis import analyze_points_vs_redlines
+import io
+import zipfile
+import tempfile
+import numpy as np
+import pandas as pd
+from utils.main_controller.main_analysis import compute_threshold_sweep, summarize_at_threshold, matches_table_at_threshold
+from utils.main_controller.job_queue import (
+    create_job_queue, submit_job, add_finished_job, get_job_status, JOB_QUEUED, JOB_DONE, JOB_FAILED, DEFAULT_MAX_CONCURRENT_JOBS
+)
 from utils.excel_controller.write_results_to_excel import write_results_to_excel
+from utils.excel_controller.write_results_columnar import write_results_columnar, COLUMNAR_FORMATS
+from utils.cache_controller.redline_catalog import create_redline_catalog, start_catalog_watcher, DEFAULT_REDLINE_DIRS
+from utils.cache_controller.result_cache import (
+    points_set_fingerprint, result_cache_key, get_cached_result, put_cached_result,
+    sweep_cache_key, get_cached_sweep, put_cached_sweep
+)
+from utils.geom_controller.match_matrix import match_curve
 from datetime import datetime
 
 st.set_page_config(page_title="🌍 KML Points vs Redlines", layout="wide")
@@ -10,302 +24,211 @@ st.title("🌍 KML Points vs Redlines Analyzer")
 
 st.markdown("""
 ### 📘 วิธีใช้งาน
-1. อัปโหลดไฟล์ **Faults Points KML**  
+1. อัปโหลดไฟล์ **Faults Points KML / KMZ**  
 2. ใส่ค่า **Threshold** (ระยะระหว่างจุดกับ Redline)  
 3. กด **Analyze**  
 4. ดาวน์โหลดผลลัพธ์ (.xlsx)
 """)
 
 
-REDLINE_FILE = [
-        "A/ยังไม่ได้แยก/U1/BJ 3007.kml",
-        "A/ยังไม่ได้แยก/U1/CMI0072_DN-CMI1000_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000 to LPN3052 (New).kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN - LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI0078_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI0078_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI1641_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI2009_DN ช่วงที่มีการคร่อมสาย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI2009_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI2009-DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-CMI1000_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1601_DN-CMI6837_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPG1521_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPG1521_DN_3.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPG1521_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN (New).kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN_หนองหอย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1601_DN-CMI1000_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1682_DN-CMI1601_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1682_DN-CMI2009_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2009_DN-CMI3010_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2009_DN-CRI3014_DN ช่วงที่มีการคร่อมสาย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2009_DN-CRI3014_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2116_DN-CMI2115_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2116_DN-CMI2115_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2250_DN-CMI0078_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2250_DN-CMI2115_DN คร่อมสาย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI3010_DN-LPG1604_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI3010_DN-LPG1604_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6738 to CMI0073.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-LPN3052_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-MHS6749_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1601_DN-CRI2065_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1720_DN-CRI2009_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI1219_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI1720_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI2067_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI2067_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI8651_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-PYO1712_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2009_DN-CRI1601_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2009_DN-CRI8625_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2009_DN-CRI8625_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2065_DN-CRI1219_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2067_DN-PYO3107_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI3014_DN-CRI8651_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8625_DN-CMI2116_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8625_DN-CMI2116_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8651_DN-CMI2115_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8651_DN-CMI2115_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG1102_DN-LPN1138_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG1102_DN-TAK2391_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG1521_DN วัดป่าขาม - LPG3120_DN แยกวัดนาแก้ว.kml",
-        "A/ยังไม่ได้แยก/U1/LPG3112_DN การประปาส่วนภูมิภาคเถิน - LPG3120_DN แยกวัดนาแก้ว.kml",
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-LPG1521_DN.kml",
+@st.cache_resource(show_spinner="⏳ กำลังโหลด Redlines...")
+def get_redline_catalog():
+    """
+    Redline catalog ที่ใช้ร่วมกันทุก session ใน server process
+    - สแกนโฟลเดอร์ redlines (ดู DEFAULT_REDLINE_DIRS) แทน list ไฟล์ที่ต้องแก้เอง
+    - thread เบื้องหลังเช็คไฟล์เพิ่ม / แก้ / ลบ แล้วโหลดเฉพาะไฟล์นั้นเข้า index ใหม่ ไม่ต้อง restart server
+    - สร้าง tree ของ UTM 47/48 ไว้ล่วงหน้า ไม่มี session ไหนต้องรอโหลดตอนกด Analyze
+    """
+    catalog = create_redline_catalog(DEFAULT_REDLINE_DIRS)
+    start_catalog_watcher(catalog)
+    return catalog
 
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-LPG1604_DN-CRI3014_DN.kml",
-        
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-LPG1604_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-PHE0569_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN1138_DN-LPN3007_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPG1102_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPG1102_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPN3051_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPN3052_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3052_DN-CMI0637_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3052_DN-CMI6837_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1601_DN-MHS6700_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1602_DN-CMI0078_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1606_DN-MHS6714_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1606_DN-MHS6749_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS6700_DN-MHS1602_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS6714_DN-MHS1603_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS6749_DN-CMI6822_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-NAN1606_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-PHE6731_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-PYO6713_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-PYO6713_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN8804_DN-NAN1606_DN.kml",
-        "A/ยังไม่ได้แยก/U1/New OFC BJ(LPN3052)-CMI1000.kml",
-        "A/ยังไม่ได้แยก/U1/New OFC.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-PHE3103_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-PHE6731_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-PHE6731_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-UTR1611_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE3103_DN-PHE6731_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN บ้านแม่ลอง - LPG1521_DN วัดป่าขาม.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN บ้านแม่ลอง-LPG1521_DN วัดป่าขาม.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN-LPG1521_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN-PHE0569_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6731_DN-LPG6737_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6746_DN-PHE6719_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6746_DN-PHE6719_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1148_DN-PYO1712_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1148_DN-PYO6713_DN OFC 60C Fig8.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1712_DN-CRI2067_DN-CRI1903_PN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1712_DN-NAN8804_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-CRI2067_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-CRI3014_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-LPG6737_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-LPG6737_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-PYO1148_DN.kml",
-        "A/ยังไม่ได้แยก/U1/SKT6708_DN-PHE6746_DN.kml",
 
-        "A/ยังไม่ได้แยก/U2/EGAT MAE SOT-EGAT_TAK1.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP1606_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP1606_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP2036_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP3188_DN_48C.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP3188_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN_48C.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1606_DN-PCT1123_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1606_DN-PCT1123_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-KPP1144_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-KPP1606_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-KPP1606_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP3188_DN-NKW1239_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP3188_DN-PCT6742_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP3188_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW0567_DN-PCB1159_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW0567_DN-PCT1125_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1082_DN-PCT1122_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1239_DN-KPP3188_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1239_DN-NKW8557_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1239_DN-PNP-I (PNP_ITL).kml",
-        "A/ยังไม่ได้แยก/U2/NKW8557_DN-NKW1082_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW8557_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW8557_DN-PNP-I.kml",
-        "A/ยังไม่ได้แยก/U2/Node แม่ตื่น-TAK-I.kml",
-        "A/ยังไม่ได้แยก/U2/Node แม่ตื่น-TAK1603_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2099_DN-PCB1159_DN_60C.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2099_DN-PCB1159_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2158_DN-PSN0545_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2158_DN-PSN0545_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2099_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2099_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2158_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2158_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB8800_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB8800_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8800_DN-PCT1125_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT-I-PLK_ITL.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT1122_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT1125_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-KPP1606_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-KPP1606_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-PCT6742_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-PCT6742_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1124_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1124_DN-PSN1160_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1124_DN-PSN1160_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1125_DN-NKW0567_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1125_DN-PCT1124_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1125_DN-PCT1124_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PCT-I.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PCT1123_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PCT1124_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PSN2005_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT6742_DN-NKW1239_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT6742_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PLK_ITL-PSN0013_DN (True 0013).kml",
-        "A/ยังไม่ได้แยก/U2/PNP-I-PCT-I.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN0017_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN0017_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN0543_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN1160_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN1160_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN1160_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN2005_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN3121_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-SKT8528_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PLK_ITL.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0013_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0545_DN-PCB2158_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0545_DN-PSN1160_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN1160_DN-PCT1124_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN1160_DN-PCT1124_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN1624_DN-PSN0543_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN2005_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN2005_DN-PSN0013_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN3121_DN-PSN0013_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2032_DN-SKT8528_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2032_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2591 DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2591_DN-SKT8528_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2591_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT3032_DN-SKT6708_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-SKT3032_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-KPP2036_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-KPP2036_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-KPP2036_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-PSN0017_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-PSN0017_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-PSN0017_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-SKT3032_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-SKT3032_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK-I-TAK2391_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK1609_DN-EGAT MAE SOT.kml",
-        "A/ยังไม่ได้แยก/U2/TAK1609_DN-TAK1603_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT2591_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT2591_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT2591_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-PSN3121_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-PSN3121_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-PSN3121_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-UTR2030_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-UTR2030_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR2030_DN-PSN1624_D_2.kml",
-        "A/ยังไม่ได้แยก/U2/UTR2030_DN-PSN1624_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR6708_DN-UTR1611_DN_60c.kml",
-    ]
-# ตรวจสอบไฟล์ redlines ทั้งหมด
-missing_files = [f for f in REDLINE_FILE if not os.path.exists(f)]
-if missing_files:
-    st.error(f"❌ ไม่พบไฟล์ Redline: {missing_files}")
+redline_catalog = get_redline_catalog()
+if redline_catalog["index"] is None:
+    st.error(f"❌ ไม่พบไฟล์ Redline ในโฟลเดอร์: {list(redline_catalog['dirs'])}")
     st.stop()
+st.caption(
+    f"🧵 Redlines: {len(redline_catalog['index']['names'])} เส้น "
+    f"(อัปเดตล่าสุด {redline_catalog['updated_at']})"
+)
+
+
+@st.cache_resource
+def get_job_queue():
+    """
+    คิวงานวิเคราะห์ที่ใช้ร่วมกันทุก session (อยู่ตลอดอายุ server process)
+    จำนวนงานที่รันพร้อมกันตั้งได้ผ่าน env PCN_MAX_CONCURRENT_JOBS
+    """
+    max_jobs = int(os.environ.get("PCN_MAX_CONCURRENT_JOBS", DEFAULT_MAX_CONCURRENT_JOBS))
+    return create_job_queue(max_workers=max_jobs)
+
+
+job_queue = get_job_queue()
 
 # ให้ user อัปโหลดหลาย points.kml พร้อมกัน
 points_files = st.file_uploader(
-    "📂 Upload Points KML (multiple files allowed)", 
-    type="kml", 
+    "📂 Upload Points KML / KMZ (multiple files allowed)", 
+    type=["kml", "kmz"], 
     accept_multiple_files=True
 )
-THRESHOLD_M = st.number_input("📏 Threshold distance (meters)", min_value=1, value=111, step=10)
+# คำนวณครั้งเดียวถึงระยะนี้ แล้วเลื่อน threshold (<= ระยะนี้) ได้ทันทีโดยไม่ต้องคำนวณใหม่
+MAX_RADIUS_M = st.number_input("📏 Max search radius (meters)", min_value=1, value=500, step=50)
+# จุดที่ไม่มีเส้นภายในระยะนี้ -> "ไม่มีภายในระยะ" แทนเส้นที่ไกลหลายร้อยกิโลเมตร (และไม่ต้องคำนวณระยะไปยังเส้นไกลๆ)
+BOUNDED_NEAREST = st.checkbox("🎯 หา redline ที่ใกล้ที่สุดเฉพาะภายใน max search radius", value=True)
+DEFAULT_THRESHOLD_M = 111
 
 # สร้าง dict สำหรับส่งเข้า analyze_points_vs_redlines
+# ส่ง UploadedFile (buffer ใน memory) ให้ parser อ่านตรงๆ ไม่เขียนลง disk
+# (ไม่มีปัญหาไฟล์ชื่อซ้ำทับกันระหว่างผู้ใช้หลายคน) - KMZ parser อ่าน doc.kml จาก archive เอง
 points_dict = {}
 if points_files:
     for uploaded_file in points_files:
         # ใช้ชื่อไฟล์เป็น key
-        key_name = uploaded_file.name
-        path = f"uploaded/{uploaded_file.name}"
-        
-        # สร้างโฟลเดอร์ uploaded ถ้ายังไม่มี
-        os.makedirs("uploaded", exist_ok=True)
-        with open(path, "wb") as f:
-            f.write(uploaded_file.read())
-        
-        points_dict[key_name] = path
+        points_dict[uploaded_file.name] = uploaded_file
 
-# รันวิเคราะห์ถ้ามีไฟล์
-if st.button("🚀 Analyze") and points_dict:
-    progress_bar = st.progress(0)
-    points_df, redline_summary = analyze_points_vs_redlines(
+def run_sweep_job(points_dict, points_fingerprint, max_radius_m, search_radius_m=None, progress_callback=None):
+    """
+    งานที่รันใน background: อ่านจุด + คำนวณระยะถึง max_radius_m ครั้งเดียว (ดู compute_threshold_sweep)
+    ใช้ index ของ redlines ณ ตอนเริ่มงานจนจบ (catalog reload ระหว่างทางไม่กระทบงานนี้)
+    ผลเก็บลง result cache (ดู sweep_cache_key) -> กด Analyze ไฟล์เดิมด้วยระยะเดิมอีกครั้งไม่ต้องคำนวณใหม่
+    """
+    redline_index = redline_catalog["index"]
+    sweep = compute_threshold_sweep(
         points_dict,
-        REDLINE_FILE,
-        threshold_m=THRESHOLD_M
+        None,
+        max_radius_m=max_radius_m,
+        progress_callback=progress_callback,
+        redline_index=redline_index,
+        search_radius_m=search_radius_m
+    )
+    if sweep is None:
+        raise RuntimeError("วิเคราะห์ไม่สำเร็จ")
+    job_result = {
+        "sweep": sweep,
+        "points_fingerprint": points_fingerprint,
+        "redline_fingerprint": redline_index["fingerprint"],
+    }
+    put_cached_sweep(
+        sweep_cache_key(points_fingerprint, max_radius_m, redline_index["fingerprint"], search_radius_m), job_result
+    )
+    return job_result
+
+
+def get_result_xlsx(job_result, threshold_m):
+    """ไฟล์ Excel ของผลที่ threshold_m - ใช้จาก result cache ถ้าเคยสร้างแล้ว ไม่งั้นเขียนใหม่แล้วเก็บลง cache"""
+    cache_key = result_cache_key(
+        job_result["points_fingerprint"], threshold_m, job_result["redline_fingerprint"],
+        job_result["sweep"]["search_radius_m"]
+    )
+    cached = get_cached_result(cache_key)
+    if cached is not None:
+        return cached
+
+    points_df, redline_summary = summarize_at_threshold(job_result["sweep"], threshold_m)
+    result_file = f"result_{threshold_m}_meter_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+    final_file = write_results_to_excel(points_df, redline_summary, threshold_m, result_file)
+    put_cached_result(cache_key, final_file)
+    with open(final_file, "rb") as f:
+        return f.read(), os.path.basename(final_file)
+
+
+def get_result_columnar_zip(job_result, threshold_m, formats, partition_by):
+    """เขียนผลที่ threshold_m เป็น Parquet / CSV / GeoPackage (ดู write_results_columnar) แล้วรวมเป็น zip ใน memory"""
+    sweep = job_result["sweep"]
+    points_df, _ = summarize_at_threshold(sweep, threshold_m)
+    matches_df = matches_table_at_threshold(sweep, threshold_m)
+    zip_buffer = io.BytesIO()
+    with tempfile.TemporaryDirectory() as output_dir:
+        write_results_columnar(points_df, matches_df, output_dir, formats=formats, partition_by=partition_by)
+        with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+            for root, _, files in os.walk(output_dir):
+                for name in files:
+                    path = os.path.join(root, name)
+                    zf.write(path, os.path.relpath(path, output_dir))
+    return zip_buffer.getvalue()
+
+
+def show_result(job_id, job_result):
+    """threshold slider + กราฟ matches vs threshold (กรองจากผลที่คำนวณไว้ อัปเดตทันที) + ดาวน์โหลด Excel"""
+    sweep = job_result["sweep"]
+    max_radius_m = int(sweep["matrix"]["max_radius_m"])
+    st.success("✅ Analysis Complete!")
+
+    threshold_m = st.slider(
+        "📏 Threshold distance (meters)", min_value=0, max_value=max_radius_m,
+        value=min(DEFAULT_THRESHOLD_M, max_radius_m), key=f"threshold_{job_id}"
     )
 
-    if points_df is not None:
-        st.success("✅ Analysis Complete!")
-        st.write(f"📌 Total points analyzed: {len(points_df)}")
-        st.dataframe(points_df.head())
+    thresholds = np.arange(0, max_radius_m + 1)
+    matched_points, total_matches = match_curve(sweep["matrix"], thresholds)
+    st.line_chart(pd.DataFrame(
+        {"จุดที่มี redline ภายใน threshold": matched_points, "จำนวนคู่ (จุด, redline)": total_matches},
+        index=pd.Index(thresholds, name="threshold (m)")
+    ))
+
+    points_df, _ = summarize_at_threshold(sweep, threshold_m)
+    st.write(f"📌 Total points analyzed: {len(points_df)} | matched @ {threshold_m} m: {int(points_df['matched'].sum())}")
+    if sweep["search_radius_m"] is not None:
+        st.write(f"🚫 ไม่มี redline ภายใน {sweep['search_radius_m']:g} m: {int(points_df['nearest_redline'].isna().sum())} จุด")
+    st.dataframe(points_df.head())
+
+    if st.button(f"📄 สร้างไฟล์ Excel ที่ {threshold_m} m", key=f"excel_{job_id}"):
+        with st.spinner("⏳ กำลังเขียน Excel..."):
+            xlsx_bytes, xlsx_name = get_result_xlsx(job_result, threshold_m)
+        st.download_button("⬇️ Download Excel", xlsx_bytes, file_name=xlsx_name)
+
+    # ไฟล์แบบ columnar สำหรับ dashboard / งานต่อ (ไม่มีข้อจำกัดจำนวน sheet / แถวแบบ Excel)
+    with st.expander("📦 Parquet / CSV / GeoPackage"):
+        formats = st.multiselect("รูปแบบไฟล์", COLUMNAR_FORMATS, default=["parquet"], key=f"formats_{job_id}")
+        partition_label = st.radio(
+            "แบ่งไฟล์ตาม", ["redline", "group", "ไม่แบ่ง"], horizontal=True, key=f"partition_{job_id}"
+        )
+        partition_by = None if partition_label == "ไม่แบ่ง" else partition_label
+        if formats and st.button(f"📦 สร้างไฟล์ที่ {threshold_m} m", key=f"columnar_{job_id}"):
+            with st.spinner("⏳ กำลังเขียนไฟล์..."):
+                zip_bytes = get_result_columnar_zip(job_result, threshold_m, formats, partition_by)
+            zip_name = f"result_{threshold_m}_meter_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip"
+            st.download_button("⬇️ Download (.zip)", zip_bytes, file_name=zip_name)
 
-        result_file = f"result_{THRESHOLD_M}_meter_{datetime.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
-        final_file = write_results_to_excel(points_df, redline_summary, THRESHOLD_M, result_file)
 
-        with open(final_file, "rb") as f:
-            st.download_button("⬇️ Download Excel", f, file_name=os.path.basename(final_file))
+@st.fragment(run_every=1.0)
+def show_job_progress(job_id):
+    """poll สถานะงานทุก 1 วินาที (rerun เฉพาะส่วนนี้) - งานจบแล้ว rerun ทั้งหน้าเพื่อแสดงผล"""
+    status = get_job_status(job_queue, job_id)
+    if status is None or status["state"] in (JOB_DONE, JOB_FAILED):
+        st.rerun()
+    if status["state"] == JOB_QUEUED:
+        st.info(f"🕒 งาน {job_id} รอคิว (มี {status['queue_position']} งานรออยู่ก่อนหน้า)")
+    else:
+        st.progress(status["progress"], text=f"⏳ งาน {job_id}: {status['text'] or 'กำลังเริ่ม'}")
+
+
+# รันวิเคราะห์ถ้ามีไฟล์
+if st.button("🚀 Analyze") and points_dict:
+    # ผลเดิม (ไฟล์ points + max radius + ชุด redlines + search radius เหมือนเดิม) ใช้จาก cache ได้ทันที
+    points_fingerprint = points_set_fingerprint(points_dict)
+    search_radius_m = MAX_RADIUS_M if BOUNDED_NEAREST else None
+    cached = get_cached_sweep(sweep_cache_key(
+        points_fingerprint, MAX_RADIUS_M, redline_catalog["index"]["fingerprint"], search_radius_m
+    ))
+    # ส่งงานเข้าคิว background แล้วจำ job id ไว้ใน URL -> refresh หน้าแล้วยังตามงานต่อได้
+    if cached is not None:
+        st.info("♻️ ใช้ผลลัพธ์จากการวิเคราะห์ครั้งก่อน (ไฟล์และระยะเหมือนเดิม)")
+        st.query_params["job"] = add_finished_job(job_queue, cached)
+    else:
+        st.query_params["job"] = submit_job(
+            job_queue, run_sweep_job, points_dict, points_fingerprint, MAX_RADIUS_M, search_radius_m
+        )
+
+job_id = st.query_params.get("job")
+if job_id:
+    status = get_job_status(job_queue, job_id)
+    if status is None:
+        st.warning(f"⚠️ ไม่พบงาน {job_id} (server อาจถูก restart) - กรุณากด Analyze ใหม่")
+    elif status["state"] == JOB_DONE:
+        show_result(job_id, status["result"])
+    elif status["state"] == JOB_FAILED:
+        st.error(f"❌ วิเคราะห์ไม่สำเร็จ: {status['error']}")
     else:
-        st.error("❌ วิเคราะห์ไม่สำเร็จ")
+        show_job_progress(job_id)
@@ -1,3 +1,5 @@
+from utils.cache_controller.redline_catalog import scan_redline_files, DEFAULT_REDLINE_DIRS
+
 points_files = {
         "M1_Close_Action": "Test/M1/Close Action.kml",
         "M1_Confirm": "Test/M1/Confirm.kml",
@@ -10,245 +12,7 @@ points_files = {
         "M3_Revise": "Test/M3/Revise.kml"
     }
 
-redlines_files = [
-        "A/ยังไม่ได้แยก/U1/BJ 3007.kml",
-        "A/ยังไม่ได้แยก/U1/CMI0072_DN-CMI1000_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000 to LPN3052 (New).kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN - LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI0078_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI0078_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI1641_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI2009_DN ช่วงที่มีการคร่อมสาย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI2009_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-CMI2009-DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-CMI1000_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1601_DN-CMI6837_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPG1521_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPG1521_DN_3.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPG1521_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN (New).kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN_หนองหอย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1000_DN-LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1601_DN-CMI1000_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1682_DN-CMI1601_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI1682_DN-CMI2009_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2009_DN-CMI3010_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2009_DN-CRI3014_DN ช่วงที่มีการคร่อมสาย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2009_DN-CRI3014_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2116_DN-CMI2115_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2116_DN-CMI2115_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2250_DN-CMI0078_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI2250_DN-CMI2115_DN คร่อมสาย.kml",
-        "A/ยังไม่ได้แยก/U1/CMI3010_DN-LPG1604_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI3010_DN-LPG1604_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6738 to CMI0073.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-LPN3052_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CMI6837_DN-MHS6749_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1601_DN-CRI2065_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1720_DN-CRI2009_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI1219_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI1720_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI2067_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI2067_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-CRI8651_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI1903_PN-PYO1712_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2009_DN-CRI1601_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2009_DN-CRI8625_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2009_DN-CRI8625_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2065_DN-CRI1219_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI2067_DN-PYO3107_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI3014_DN-CRI8651_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8625_DN-CMI2116_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8625_DN-CMI2116_DN.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8651_DN-CMI2115_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/CRI8651_DN-CMI2115_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG1102_DN-LPN1138_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG1102_DN-TAK2391_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG1521_DN วัดป่าขาม - LPG3120_DN แยกวัดนาแก้ว.kml",
-        "A/ยังไม่ได้แยก/U1/LPG3112_DN การประปาส่วนภูมิภาคเถิน - LPG3120_DN แยกวัดนาแก้ว.kml",
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-LPG1521_DN.kml",
-
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-LPG1604_DN-CRI3014_DN.kml",
-        
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-LPG1604_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPG6737_DN-PHE0569_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN1138_DN-LPN3007_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPG1102_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPG1102_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPN3051_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPN3052_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3007_DN-LPN3052_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3052_DN-CMI0637_DN.kml",
-        "A/ยังไม่ได้แยก/U1/LPN3052_DN-CMI6837_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1601_DN-MHS6700_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1602_DN-CMI0078_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1606_DN-MHS6714_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS1606_DN-MHS6749_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS6700_DN-MHS1602_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS6714_DN-MHS1603_DN.kml",
-        "A/ยังไม่ได้แยก/U1/MHS6749_DN-CMI6822_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-NAN1606_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-PHE6731_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-PYO6713_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/NAN1288_DN-PYO6713_DN.kml",
-        "A/ยังไม่ได้แยก/U1/NAN8804_DN-NAN1606_DN.kml",
-        "A/ยังไม่ได้แยก/U1/New OFC BJ(LPN3052)-CMI1000.kml",
-        "A/ยังไม่ได้แยก/U1/New OFC.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-PHE3103_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-PHE6731_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-PHE6731_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE0569_DN-UTR1611_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE3103_DN-PHE6731_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN บ้านแม่ลอง - LPG1521_DN วัดป่าขาม.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN บ้านแม่ลอง-LPG1521_DN วัดป่าขาม.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN-LPG1521_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6719_DN-PHE0569_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6731_DN-LPG6737_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6746_DN-PHE6719_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/PHE6746_DN-PHE6719_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1148_DN-PYO1712_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1148_DN-PYO6713_DN OFC 60C Fig8.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1712_DN-CRI2067_DN-CRI1903_PN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO1712_DN-NAN8804_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-CRI2067_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-CRI3014_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-LPG6737_DN_2.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-LPG6737_DN.kml",
-        "A/ยังไม่ได้แยก/U1/PYO3107_DN-PYO1148_DN.kml",
-        "A/ยังไม่ได้แยก/U1/SKT6708_DN-PHE6746_DN.kml",
+# ไฟล์ redlines: สแกนทุก .kml / .kmz ในโฟลเดอร์เหล่านี้ (เพิ่มสายใหม่ = วางไฟล์ในโฟลเดอร์ ไม่ต้องแก้ list)
+redline_dirs = list(DEFAULT_REDLINE_DIRS)
 
-        "A/ยังไม่ได้แยก/U2/EGAT MAE SOT-EGAT_TAK1.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP1606_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP1606_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP2036_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP3188_DN_48C.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-KPP3188_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN_48C.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1144_DN-TAK2391_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1606_DN-PCT1123_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP1606_DN-PCT1123_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-KPP1144_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-KPP1606_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-KPP1606_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP2036_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP3188_DN-NKW1239_DN.kml",
-        "A/ยังไม่ได้แยก/U2/KPP3188_DN-PCT6742_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/KPP3188_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW0567_DN-PCB1159_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW0567_DN-PCT1125_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1082_DN-PCT1122_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1239_DN-KPP3188_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1239_DN-NKW8557_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW1239_DN-PNP-I (PNP_ITL).kml",
-        "A/ยังไม่ได้แยก/U2/NKW8557_DN-NKW1082_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW8557_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/NKW8557_DN-PNP-I.kml",
-        "A/ยังไม่ได้แยก/U2/Node แม่ตื่น-TAK-I.kml",
-        "A/ยังไม่ได้แยก/U2/Node แม่ตื่น-TAK1603_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2099_DN-PCB1159_DN_60C.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2099_DN-PCB1159_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2158_DN-PSN0545_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB2158_DN-PSN0545_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2099_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2099_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2158_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB2158_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB8800_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8030_PN-PCB8800_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCB8800_DN-PCT1125_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT-I-PLK_ITL.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT1122_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT1125_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1120_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-KPP1606_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-KPP1606_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-PCT6742_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-PCT6742_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1123_DN-PCT6742_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1124_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1124_DN-PSN1160_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1124_DN-PSN1160_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1125_DN-NKW0567_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1125_DN-PCT1124_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1125_DN-PCT1124_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PCT-I.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PCT1123_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PCT1124_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT1291_DN-PSN2005_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PCT6742_DN-NKW1239_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PCT6742_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PLK_ITL-PSN0013_DN (True 0013).kml",
-        "A/ยังไม่ได้แยก/U2/PNP-I-PCT-I.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0012_DN-PCT1123_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN0017_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN0017_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN0543_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN1160_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN1160_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN1160_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN2005_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-PSN3121_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-SKT8528_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0013_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PLK_ITL.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0012_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-PSN0013_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0017_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0545_DN-PCB2158_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN0545_DN-PSN1160_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN1160_DN-PCT1124_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/PSN1160_DN-PCT1124_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN1624_DN-PSN0543_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN2005_DN-PCT1291_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN2005_DN-PSN0013_DN.kml",
-        "A/ยังไม่ได้แยก/U2/PSN3121_DN-PSN0013_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2032_DN-SKT8528_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2032_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2591 DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2591_DN-SKT8528_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT2591_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT3032_DN-SKT6708_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-SKT3032_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/SKT6708_DN-UTR1611_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-KPP2036_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-KPP2036_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-KPP2036_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-PSN0017_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-PSN0017_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-PSN0017_DN.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-SKT3032_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/SKT8528_DN-SKT3032_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK-I-TAK2391_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK1609_DN-EGAT MAE SOT.kml",
-        "A/ยังไม่ได้แยก/U2/TAK1609_DN-TAK1603_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN_4.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-KPP2036_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT2591_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT2591_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT2591_DN.kml",
-        "A/ยังไม่ได้แยก/U2/TAK2391_DN-SKT8528_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-PSN3121_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-PSN3121_DN_3.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-PSN3121_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-UTR2030_DN_2.kml",
-        "A/ยังไม่ได้แยก/U2/UTR1611_DN-UTR2030_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR2030_DN-PSN1624_D_2.kml",
-        "A/ยังไม่ได้แยก/U2/UTR2030_DN-PSN1624_DN.kml",
-        "A/ยังไม่ได้แยก/U2/UTR6708_DN-UTR1611_DN_60c.kml",
-    ]
+redlines_files = scan_redline_files(redline_dirs)
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test ของ serve_nearest.py: ยิง query จุดเดียว (หรือ batch) จากหลาย connection พร้อมกันแบบ keep-alive
+แล้วรายงาน throughput และ latency (p50 / p90 / p99 / max) เป็น JSON
+
+    python serve_nearest.py &
+    python load_test_nearest.py --concurrency 1 --duration 10
+    python load_test_nearest.py --concurrency 8 --duration 30 --batch-size 100
+"""
+
+import json
+import time
+import random
+import argparse
+import threading
+import http.client
+
+import numpy as np
+
+# กรอบพิกัดภาคเหนือ / ประเทศไทย (สุ่มจุดภายในกรอบนี้)
+DEFAULT_BBOX = (97.3, 14.0, 101.5, 20.5)  # min_lon, min_lat, max_lon, max_lat
+
+
+def _worker(args, deadline, latencies, errors, seed):
+    rng = random.Random(seed)
+    min_lon, min_lat, max_lon, max_lat = args.bbox
+    conn = http.client.HTTPConnection(args.host, args.port, timeout=10)
+    while time.perf_counter() < deadline:
+        points = [(rng.uniform(min_lat, max_lat), rng.uniform(min_lon, max_lon)) for _ in range(args.batch_size)]
+        t0 = time.perf_counter()
+        try:
+            if args.batch_size == 1:
+                lat, lon = points[0]
+                conn.request("GET", f"/nearest?lat={lat:.6f}&lon={lon:.6f}&threshold_m={args.threshold_m}")
+            else:
+                body = json.dumps({"points": points, "threshold_m": args.threshold_m})
+                conn.request("POST", "/nearest/batch", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            if response.status != 200:
+                errors.append(response.status)
+                continue
+        except (OSError, http.client.HTTPException) as e:
+            errors.append(repr(e))
+            conn.close()
+            conn = http.client.HTTPConnection(args.host, args.port, timeout=10)
+            continue
+        latencies.append(time.perf_counter() - t0)
+    conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test ของ nearest-redline service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=4, help="จำนวน connection พร้อมกัน")
+    parser.add_argument("--duration", type=float, default=10.0, help="ระยะเวลาทดสอบ (วินาที)")
+    parser.add_argument("--batch-size", type=int, default=1, help="1 = GET จุดเดียว, >1 = POST /nearest/batch")
+    parser.add_argument("--threshold-m", type=float, default=111)
+    parser.add_argument("--bbox", type=float, nargs=4, default=DEFAULT_BBOX, metavar=("MIN_LON", "MIN_LAT", "MAX_LON", "MAX_LAT"))
+    args = parser.parse_args(argv)
+
+    latencies = []
+    errors = []
+    start = time.perf_counter()
+    deadline = start + args.duration
+    threads = [
+        threading.Thread(target=_worker, args=(args, deadline, latencies, errors, seed))
+        for seed in range(args.concurrency)
+    ]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    ms = np.array(latencies) * 1000
+    report = {
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_s": round(len(latencies) / elapsed, 1),
+        "points_per_s": round(len(latencies) * args.batch_size / elapsed, 1),
+    }
+    if len(ms):
+        report["latency_ms"] = {
+            "p50": round(float(np.percentile(ms, 50)), 3),
+            "p90": round(float(np.percentile(ms, 90)), 3),
+            "p99": round(float(np.percentile(ms, 99)), 3),
+            "max": round(float(ms.max()), 3),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+รันวิเคราะห์แบบ batch (ไม่ต้องเปิด UI) ตาม job spec - เช่นงาน nightly บน server
+
+    python run_batch.py batch_job.example.json
+    python run_batch.py job.json --output-dir out/2025-03 --thresholds 50 111 200 --workers 8
+
+ผลลัพธ์ทุกชุดอยู่ใน output_dir พร้อม summary.json (เวลาแต่ละขั้น + จำนวน match ต่อชุด)
+exit code 1 ถ้ามีชุดใดล้มเหลว
+"""
+
+import sys
+import json
+import logging
+import argparse
+
+from utils.main_controller.batch_runner import load_job_spec, run_batch
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="KML points vs redlines - batch runner")
+    parser.add_argument("job_spec", help="ไฟล์ job spec (JSON)")
+    parser.add_argument("--output-dir", help="โฟลเดอร์ผลลัพธ์ (แทนค่าใน job spec)")
+    parser.add_argument("--thresholds", type=float, nargs="+", help="ระยะ threshold (เมตร) (แทนค่าใน job spec)")
+    parser.add_argument("--workers", type=int, help="จำนวนงานที่รันพร้อมกัน (แทนค่าใน job spec)")
+    args = parser.parse_args(argv)
+
+    spec = load_job_spec(args.job_spec)
+    if args.output_dir:
+        spec["output_dir"] = args.output_dir
+    if args.thresholds:
+        spec["thresholds"] = args.thresholds
+    if args.workers:
+        spec["workers"] = args.workers
+
+    summary = run_batch(spec)
+    print(json.dumps(
+        {key: summary[key] for key in ("total_s", "load_redlines_s", "read_points_s")}
+        | {"runs": len(summary["runs"]), "errors": len(summary["errors"])},
+        ensure_ascii=False,
+    ))
+    return 1 if summary["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+HTTP service ถามว่า "จุดนี้อยู่บนสายเส้นไหน" โดยไม่ต้องอัปโหลด KML
+(โหลด redlines จากโฟลเดอร์ใน config.redline_dirs ครั้งเดียว แล้วเฝ้าไฟล์เพิ่ม / แก้ / ลบ - ไม่ต้อง restart)
+
+    python serve_nearest.py --port 8765
+    curl "http://127.0.0.1:8765/nearest?lat=18.79&lon=98.98&threshold_m=111"
+    curl -X POST http://127.0.0.1:8765/nearest/batch -d '{"points": [[18.79, 98.98]], "threshold_m": 111}'
+
+ดู load_test_nearest.py สำหรับวัด latency / throughput
+"""
+
+import logging
+import argparse
+
+from config import redline_dirs
+from utils.cache_controller.redline_catalog import create_redline_catalog, start_catalog_watcher, DEFAULT_WATCH_INTERVAL_S
+from utils.query_controller.nearest_service import query_nearest, make_server, DEFAULT_HOST, DEFAULT_PORT
+
+logging.basicConfig(level=logging.INFO, format="%(levelname)s: %(message)s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Nearest-redline query service")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_WATCH_INTERVAL_S,
+                        help="เช็คไฟล์ redlines เปลี่ยนทุกกี่วินาที (0 = ไม่เฝ้า)")
+    args = parser.parse_args(argv)
+
+    catalog = create_redline_catalog(redline_dirs)
+    if catalog['index'] is None:
+        parser.error(f"ไม่พบไฟล์ redlines ในโฟลเดอร์: {redline_dirs}")
+    # query แรกก่อนเปิดรับ request (โหลด transformer / tree ให้อุ่นก่อน)
+    query_nearest(catalog['index'], 18.79, 98.98)
+    if args.watch_interval > 0:
+        start_catalog_watcher(catalog, interval_s=args.watch_interval)
+
+    server = make_server(catalog, args.host, args.port)
+    logging.info("พร้อมให้บริการที่ http://%s:%d (%d redlines)", args.host, args.port, len(catalog['index']['names']))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
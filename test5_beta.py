@@ -20,7 +20,7 @@ from datetime import datetime
 
 from utils.parse_controller.parse_points import parse_kml_points
 from utils.parse_controller.parse_lines import parse_kml_lines
-from utils.excel_controller.save_points_to_excel import save_points_to_excel
+from utils.main_controller.convert_points import convert_points_files
 from utils.main_controller.main_analysis import analyze_points_vs_redlines  
 from utils.excel_controller.write_results_to_excel import write_results_to_excel
 
@@ -44,50 +44,9 @@ if __name__ == "__main__":
     # กำหนดไฟล์ points ตามกลุ่ม (แก้ paths ตามจริง)
     from config import points_files
 
-    M1_Close_Action_file = "Test/M1/Close Action.kml"
-    excel_file = "ALL POINTS/points_output_M1_Close_Action.xlsx"
-    points_list = parse_kml_points(M1_Close_Action_file)
-    save_points_to_excel(points_list, excel_file)
-    
-    M1_Confirm_file = "Test/M1/Confirm.kml"
-    excel_file = "ALL POINTS/points_output_M1_Confirm.xlsx"
-    points_list = parse_kml_points(M1_Confirm_file)
-    save_points_to_excel(points_list, excel_file)
-
-    M1_Revise_file = "Test/M1/Revise.kml"
-    excel_file = "ALL POINTS/points_output_M1_Revise.xlsx"
-    points_list = parse_kml_points(M1_Revise_file)
-    save_points_to_excel(points_list, excel_file)
-
-    M2_Close_Action_file = "Test/M2/Close Action.kml"
-    excel_file = "ALL POINTS/points_output_M2_Close_Action.xlsx"
-    points_list = parse_kml_points(M2_Close_Action_file)
-    save_points_to_excel(points_list, excel_file)
-    
-    M2_Confirm_file = "Test/M2/Confirm.kml"
-    excel_file = "ALL POINTS/points_output_M2_Confirm.xlsx"
-    points_list = parse_kml_points(M2_Confirm_file)
-    save_points_to_excel(points_list, excel_file)
-
-    M2_Revise_file = "Test/M2/Revise.kml"
-    excel_file = "ALL POINTS/points_output_M2_Revise.xlsx"
-    points_list = parse_kml_points(M2_Revise_file)
-    save_points_to_excel(points_list, excel_file)
-
-    M3_Close_Action_file = "Test/M3/Close Action.kml"
-    excel_file = "ALL POINTS/points_output_M3_Close_Action.xlsx"
-    points_list = parse_kml_points(M3_Close_Action_file)
-    save_points_to_excel(points_list, excel_file)
-    
-    M3_Confirm_file = "Test/M3/Confirm.kml"
-    excel_file = "ALL POINTS/points_output_M3_Confirm.xlsx"
-    points_list = parse_kml_points(M3_Confirm_file)
-    save_points_to_excel(points_list, excel_file)
-
-    M3_Revise_file = "Test/M3/Revise.kml"
-    excel_file = "ALL POINTS/points_output_M3_Revise.xlsx"
-    points_list = parse_kml_points(M3_Revise_file)
-    save_points_to_excel(points_list, excel_file)
+    # แปลงไฟล์ points ทุกกลุ่มพร้อมกัน -> workbook เดียว 1 sheet ต่อกลุ่ม
+    # (หรือ output_format="parquet" -> dataset เดียวแยกโฟลเดอร์ตามกลุ่ม)
+    convert_points_files(points_files, "ALL POINTS/points_output.xlsx")
 
     
     # redline files list
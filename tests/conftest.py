@@ -0,0 +1,5 @@
+import os
+import sys
+
+# รันจาก root ของ repo ได้ทั้ง `pytest` และ `python -m pytest` (utils เป็น namespace package ไม่ได้ติดตั้ง)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
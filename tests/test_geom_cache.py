@@ -0,0 +1,32 @@
+from utils.cache_controller.geom_cache import load_redline_geoms, redline_display_names
+
+_KML = """<?xml version="1.0" encoding="UTF-8"?>
+<kml xmlns="http://www.opengis.net/kml/2.2"><Document><Placemark>
+<LineString><coordinates>{coords}</coordinates></LineString>
+</Placemark></Document></kml>
+"""
+
+
+def _write_kml(path, coords):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(_KML.format(coords=" ".join(f"{lon},{lat},0" for lon, lat in coords)), encoding="utf-8")
+    return str(path)
+
+
+def test_same_filename_in_two_folders_gets_unique_names(tmp_path):
+    u1 = _write_kml(tmp_path / "U1" / "NAN1288_DN-PHE6731_DN.kml", [(100.0, 18.0), (100.1, 18.1)])
+    split = _write_kml(tmp_path / "แยกแล้ว" / "NAN1288_DN-PHE6731_DN.kml", [(100.5, 18.5), (100.6, 18.6)])
+    other = _write_kml(tmp_path / "U1" / "CMI1000_DN-CMI0078_DN.kml", [(99.0, 18.7), (99.1, 18.8)])
+
+    redline_geoms = load_redline_geoms([u1, split, other], cache_dir=None, max_workers=1)
+
+    assert [rl['name'] for rl in redline_geoms] == [
+        "U1/NAN1288_DN-PHE6731_DN.kml",
+        "แยกแล้ว/NAN1288_DN-PHE6731_DN.kml",
+        "CMI1000_DN-CMI0078_DN.kml",
+    ]
+    assert [rl['path'] for rl in redline_geoms] == [u1, split, other]
+
+
+def test_display_names_keep_plain_filename_when_unique():
+    assert redline_display_names(["A/U1/a.kml", "A/U2/b.kmz"]) == ["a.kml", "b.kmz"]
@@ -0,0 +1,24 @@
+import numpy as np
+import shapely
+from shapely.geometry import LineString, MultiLineString
+
+from utils.geom_controller.redline_index import split_into_segments
+
+
+def _segment_coords(segments):
+    return shapely.get_coordinates(segments).reshape(-1, 2, 2).tolist()
+
+
+def test_repeated_vertex_does_not_create_zero_length_segment():
+    line = LineString([(0, 0), (10, 0), (10, 0), (10, 5)])
+
+    segments = split_into_segments(line)
+
+    assert _segment_coords(segments) == [[[0, 0], [10, 0]], [[10, 0], [10, 5]]]
+    assert np.all(shapely.length(segments) > 0)
+
+
+def test_segments_do_not_join_separate_parts():
+    lines = MultiLineString([[(0, 0), (1, 0)], [(1, 0), (1, 0), (2, 0)]])
+
+    assert _segment_coords(split_into_segments(lines)) == [[[0, 0], [1, 0]], [[1, 0], [2, 0]]]
@@ -0,0 +1,199 @@
+import os
+import json
+import hashlib
+import logging
+
+import numpy as np
+import shapely
+
+from ..parse_controller.parse_lines import parse_kml_lines_parallel
+from ..geom_controller.geom import get_transformer_to_utm, project_geom_with_transformer
+
+# โฟลเดอร์เก็บ cache ของ geometry redline (ลบทิ้งได้ทุกเมื่อ จะสร้างใหม่เอง)
+DEFAULT_GEOM_CACHE_DIR = ".cache/redlines"
+# UTM zone ที่ครอบคลุมประเทศไทย (47N, 48N) -> project เก็บไว้ล่วงหน้า
+PRECOMPUTED_EPSGS = (32647, 32648)
+
+_MANIFEST_NAME = "manifest.json"
+
+
+def file_sha1(filename):
+    """คำนวณ SHA-1 ของเนื้อหาไฟล์ (อ่านทีละ block)"""
+    h = hashlib.sha1()
+    with open(filename, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def fingerprint_from_hashes(hashes):
+    """
+    fingerprint ของชุด redlines (SHA-1 รวมของ path + SHA-1 เนื้อหาทุกไฟล์ตามลำดับ)
+    hashes: list ของ (path, SHA-1 หรือ None ถ้าไม่มีไฟล์) - เปลี่ยนเมื่อมีไฟล์ใดถูกแก้ เพิ่ม ลบ หรือสลับลำดับ
+    """
+    h = hashlib.sha1()
+    for fname, sha1 in hashes:
+        h.update(os.fspath(fname).encode("utf-8"))
+        if sha1 is not None:
+            h.update(sha1.encode("ascii"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
+def redline_display_names(paths):
+    """
+    ชื่อเส้นที่ใช้ในผลลัพธ์ = ชื่อไฟล์ (เหมือนเดิม)
+    ถ้ามีชื่อไฟล์ซ้ำกันในหลายโฟลเดอร์ (เช่น U1 กับ แยกแล้ว) จะนำหน้าด้วยชื่อโฟลเดอร์ ไม่ให้ผลของสองไฟล์รวมกัน
+    """
+    basenames = [os.path.basename(path) for path in paths]
+    counts = {}
+    for name in basenames:
+        counts[name] = counts.get(name, 0) + 1
+    return [
+        name if counts[name] == 1 else f"{os.path.basename(os.path.dirname(path))}/{name}"
+        for path, name in zip(paths, basenames)
+    ]
+
+
+def _load_manifest(cache_dir):
+    path = os.path.join(cache_dir, _MANIFEST_NAME)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning("อ่าน manifest ของ geometry cache ไม่ได้ (%s) - เริ่มใหม่", e)
+        return {}
+
+
+def _save_manifest(cache_dir, manifest):
+    path = os.path.join(cache_dir, _MANIFEST_NAME)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
+
+
+def _write_entry(cache_dir, sha1, geom, epsg_cache):
+    """เขียน geometry (lon/lat + projected) เป็น WKB ใน .npz ไฟล์เดียว"""
+    arrays = {}
+    if geom is not None:
+        arrays["geom"] = np.frombuffer(shapely.to_wkb(geom), dtype=np.uint8)
+        for epsg, projected_geom in epsg_cache.items():
+            arrays[f"epsg_{epsg}"] = np.frombuffer(shapely.to_wkb(projected_geom), dtype=np.uint8)
+    entry_file = f"{sha1}.npz"
+    tmp_path = os.path.join(cache_dir, entry_file + ".tmp")
+    with open(tmp_path, "wb") as f:
+        np.savez(f, **arrays)
+    os.replace(tmp_path, os.path.join(cache_dir, entry_file))
+    return entry_file
+
+
+def _read_entry(cache_dir, entry_file):
+    """อ่าน entry จาก cache คืนค่า (geom, epsg_cache) หรือ (None, {}) ถ้าไฟล์ไม่มีเส้น"""
+    with np.load(os.path.join(cache_dir, entry_file)) as data:
+        if "geom" not in data.files:
+            return None, {}
+        geom = shapely.from_wkb(data["geom"].tobytes())
+        epsg_cache = {
+            int(key.split("_", 1)[1]): shapely.from_wkb(data[key].tobytes())
+            for key in data.files if key.startswith("epsg_")
+        }
+    return geom, epsg_cache
+
+
+def _remove_unreferenced_entries(cache_dir, manifest):
+    """ลบไฟล์ .npz ที่ไม่มี manifest entry ไหนอ้างถึงแล้ว (ไฟล์เวอร์ชันเก่า)"""
+    referenced = {entry["file"] for entry in manifest.values()}
+    for name in os.listdir(cache_dir):
+        if name.endswith(".npz") and name not in referenced:
+            try:
+                os.remove(os.path.join(cache_dir, name))
+            except OSError:
+                pass
+
+
+def _project_to_precomputed(geom):
+    """project geometry (lon/lat) ไปยัง PRECOMPUTED_EPSGS → epsg_cache dict"""
+    if geom is None:
+        return {}
+    return {
+        epsg: project_geom_with_transformer(geom, get_transformer_to_utm(epsg))
+        for epsg in PRECOMPUTED_EPSGS
+    }
+
+
+def load_redline_geoms(redlines_files, cache_dir=DEFAULT_GEOM_CACHE_DIR, max_workers=None):
+    """
+    โหลด redlines ทั้งหมด -> list ของ dict {'name','path','geom','epsg_cache'} (ตามลำดับ redlines_files)
+    - name ไม่ซ้ำกันภายใน redlines_files (ดู redline_display_names)
+    - ใช้ cache บน disk โดย key = path + mtime + SHA-1 ของเนื้อหา
+      ถ้า mtime/size ไม่เปลี่ยนจะไม่อ่านไฟล์เลย, ถ้า mtime เปลี่ยนแต่ hash เดิมก็ใช้ cache ต่อ
+    - parse ใหม่เฉพาะไฟล์ที่เปลี่ยน (พร้อมกันด้วย process pool ดู parse_kml_lines_parallel)
+      และเก็บ geometry ที่ project ไป UTM 47/48 ไว้ด้วย
+    - cache_dir=None = ไม่ใช้ cache (parse ทุกไฟล์)
+    - max_workers: จำนวน process สำหรับ parse (None = จำนวน CPU, 1 = ไม่ใช้ pool)
+    """
+    redlines_files = list(redlines_files)
+    manifest = {}
+    if cache_dir:
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest = _load_manifest(cache_dir)
+    manifest_changed = False
+
+    # 1) หา entry ใน cache ของแต่ละไฟล์
+    loaded = [None] * len(redlines_files)   # (geom, epsg_cache) ของไฟล์ที่ได้จาก cache
+    file_info = [None] * len(redlines_files)  # (key, stat, sha1) ของไฟล์ที่ต้องเขียน cache
+    for i, fname in enumerate(redlines_files):
+        if not cache_dir or not os.path.exists(fname):
+            # ไฟล์ที่ไม่มีอยู่ให้ parse_kml_lines เป็นคน log warning เหมือนเดิม
+            continue
+        stat = os.stat(fname)
+        key = os.path.abspath(fname)
+        entry = manifest.get(key)
+        if entry and entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            sha1 = entry["sha1"]
+        else:
+            sha1 = file_sha1(fname)
+        file_info[i] = (key, stat, sha1)
+
+        if entry and entry["sha1"] == sha1:
+            try:
+                loaded[i] = _read_entry(cache_dir, entry["file"])
+            except (OSError, ValueError, shapely.errors.GEOSException) as e:
+                logging.warning("cache ของ %s เสีย (%s) - parse ใหม่", fname, e)
+                continue
+            new_entry = {**entry, "mtime": stat.st_mtime, "size": stat.st_size}
+            if entry != new_entry:
+                manifest[key] = new_entry
+                manifest_changed = True
+    hits = sum(1 for item in loaded if item is not None)
+
+    # 2) parse ไฟล์ที่ไม่มีใน cache พร้อมกัน แล้ว project + เขียน cache
+    missing = [i for i, item in enumerate(loaded) if item is None]
+    if missing:
+        parsed = parse_kml_lines_parallel([redlines_files[i] for i in missing], max_workers=max_workers)
+        for i, geom in zip(missing, parsed):
+            epsg_cache = _project_to_precomputed(geom) if cache_dir else {}
+            loaded[i] = (geom, epsg_cache)
+            if file_info[i] is not None:
+                key, stat, sha1 = file_info[i]
+                entry_file = _write_entry(cache_dir, sha1, geom, epsg_cache)
+                manifest[key] = {"sha1": sha1, "file": entry_file, "mtime": stat.st_mtime, "size": stat.st_size}
+                manifest_changed = True
+
+    redline_geoms = []
+    for fname, name, (geom, epsg_cache) in zip(redlines_files, redline_display_names(redlines_files), loaded):
+        if geom is None:
+            logging.warning("redline %s ไม่มี geometry - ข้าม", fname)
+            continue
+        redline_geoms.append({'name': name, 'path': fname, 'geom': geom, 'epsg_cache': epsg_cache})
+        logging.info("โหลด redline: %s", fname)
+
+    if cache_dir:
+        if manifest_changed:
+            _save_manifest(cache_dir, manifest)
+            _remove_unreferenced_entries(cache_dir, manifest)
+        logging.info("geometry cache: ใช้ cache %d/%d ไฟล์", hits, len(redlines_files))
+    return redline_geoms
@@ -0,0 +1,199 @@
+import os
+import json
+import logging
+import threading
+from datetime import datetime
+
+import shapely
+
+from .geom_cache import load_redline_geoms, redline_display_names, file_sha1, fingerprint_from_hashes, DEFAULT_GEOM_CACHE_DIR, PRECOMPUTED_EPSGS
+from ..geom_controller.redline_index import build_redline_index
+
+# โฟลเดอร์ที่เก็บไฟล์ redlines (สแกนทุกไฟล์ในโฟลเดอร์ ไม่รวมโฟลเดอร์ย่อย)
+DEFAULT_REDLINE_DIRS = (
+    "A/ยังไม่ได้แยก/U1",
+    "A/ยังไม่ได้แยก/U2",
+    "A/แยกแล้ว",
+)
+REDLINE_EXTENSIONS = (".kml", ".kmz")
+# manifest ของ catalog (path, size, mtime, sha1, bbox ต่อไฟล์) - ลบทิ้งได้ จะสร้างใหม่เอง
+DEFAULT_CATALOG_FILE = ".cache/redline_catalog.json"
+# ความถี่ในการเช็คไฟล์เปลี่ยน (วินาที) - เช็คแค่ stat ไม่อ่านไฟล์ถ้า mtime/size เดิม
+DEFAULT_WATCH_INTERVAL_S = 5.0
+
+
+def scan_redline_files(redline_dirs=DEFAULT_REDLINE_DIRS):
+    """ไฟล์ redlines (.kml / .kmz) ทั้งหมดในโฟลเดอร์ -> list ของ path เรียงตามลำดับโฟลเดอร์ แล้วตามชื่อไฟล์"""
+    files = []
+    for redline_dir in redline_dirs:
+        if not os.path.isdir(redline_dir):
+            logging.warning("ไม่พบโฟลเดอร์ redlines: %s", redline_dir)
+            continue
+        names = sorted(
+            entry.name for entry in os.scandir(redline_dir)
+            if entry.is_file() and entry.name.lower().endswith(REDLINE_EXTENSIONS)
+        )
+        files.extend(os.path.join(redline_dir, name) for name in names)
+    return files
+
+
+def _load_catalog_entries(catalog_file):
+    if not catalog_file or not os.path.exists(catalog_file):
+        return {}
+    try:
+        with open(catalog_file, "r", encoding="utf-8") as f:
+            return {entry["path"]: entry for entry in json.load(f)["entries"]}
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        logging.warning("อ่าน redline catalog ไม่ได้ (%s) - สแกนใหม่", e)
+        return {}
+
+
+def _save_catalog_entries(catalog):
+    catalog_file = catalog['catalog_file']
+    if not catalog_file:
+        return
+    os.makedirs(os.path.dirname(catalog_file) or ".", exist_ok=True)
+    tmp_path = catalog_file + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump({
+            'dirs': list(catalog['dirs']),
+            'fingerprint': catalog['fingerprint'],
+            'entries': [catalog['entries'][path] for path in catalog['files']],
+        }, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, catalog_file)
+
+
+def create_redline_catalog(redline_dirs=DEFAULT_REDLINE_DIRS, geom_cache_dir=DEFAULT_GEOM_CACHE_DIR,
+                           catalog_file=DEFAULT_CATALOG_FILE, epsgs=PRECOMPUTED_EPSGS):
+    """
+    สร้าง redline catalog: สแกนโฟลเดอร์ redlines -> manifest ต่อไฟล์ + redline index ใน memory
+    คืนค่า dict (แก้ในที่โดย refresh_redline_catalog):
+      - 'files': path ของไฟล์ทั้งหมดตามลำดับ (ดู scan_redline_files)
+      - 'entries': path -> {'path','size','mtime','sha1','bbox'} (bbox = [min_lon, min_lat, max_lon, max_lat] หรือ None ถ้าไม่มีเส้น)
+      - 'index': redline index ของเส้นที่ใช้งานได้ (None ถ้าไม่มีเลย) - ถูกแทนทั้งก้อนเมื่อมีไฟล์เปลี่ยน
+        ผู้ใช้ควรอ่าน catalog['index'] ครั้งเดียวต่องาน แล้วใช้ตัวนั้นจนจบ (index['fingerprint'] = fingerprint ของชุดนั้น)
+      - 'fingerprint': fingerprint ของชุดไฟล์ (ดู fingerprint_from_hashes), 'version': เพิ่มทีละ 1 ทุกครั้งที่ index เปลี่ยน
+    """
+    catalog = {
+        'dirs': tuple(redline_dirs),
+        'geom_cache_dir': geom_cache_dir,
+        'catalog_file': catalog_file,
+        'epsgs': tuple(epsgs),
+        'files': [],
+        'entries': _load_catalog_entries(catalog_file),
+        'redlines': {},
+        'index': None,
+        'fingerprint': None,
+        'version': 0,
+        'updated_at': None,
+        'lock': threading.Lock(),
+    }
+    refresh_redline_catalog(catalog, force=True)
+    return catalog
+
+
+def refresh_redline_catalog(catalog, force=False):
+    """
+    สแกนโฟลเดอร์ใหม่แล้วอัปเดตเฉพาะไฟล์ที่เพิ่ม / แก้ / ลบ
+      - ไฟล์ที่ mtime/size เดิมไม่อ่านเลย, mtime เปลี่ยนแต่ SHA-1 เดิมถือว่าไม่เปลี่ยน
+      - parse เฉพาะไฟล์ที่เปลี่ยน (ผ่าน geometry cache ดู load_redline_geoms), เส้นเดิมใช้ geometry / segment เดิม
+      - มีการเปลี่ยนแปลงเมื่อไหร่ก็สร้าง index ใหม่แล้วสลับเข้า catalog['index'] (งานที่ถือ index เก่าอยู่ทำต่อได้)
+    force=True สร้าง index ใหม่แม้ไม่มีไฟล์เปลี่ยน
+    คืนค่า dict {'added','modified','removed'} (list ของ path)
+    """
+    with catalog['lock']:
+        files = scan_redline_files(catalog['dirs'])
+        entries = catalog['entries']
+        redlines = catalog['redlines']
+        changes = {'added': [], 'modified': [], 'removed': []}
+
+        new_entries = {}
+        for path in files:
+            entry = entries.get(path)
+            try:
+                stat = os.stat(path)
+                if entry and entry['mtime'] == stat.st_mtime and entry['size'] == stat.st_size:
+                    new_entries[path] = entry
+                    continue
+                sha1 = file_sha1(path)
+            except FileNotFoundError:
+                # ถูกลบระหว่างสแกน -> ถือว่าไม่มีไฟล์นี้
+                continue
+            new_entries[path] = {'path': path, 'size': stat.st_size, 'mtime': stat.st_mtime, 'sha1': sha1, 'bbox': None}
+            if entry is None:
+                changes['added'].append(path)
+            elif entry['sha1'] != sha1:
+                changes['modified'].append(path)
+            else:
+                # แค่ touch ไฟล์ -> ใช้ bbox / geometry เดิม
+                new_entries[path]['bbox'] = entry['bbox']
+        files = [path for path in files if path in new_entries]
+        changes['removed'] = [path for path in catalog['files'] if path not in new_entries]
+
+        # ไฟล์ที่ต้องโหลด geometry: เพิ่ม / แก้ หรือมีเส้นแต่ยังไม่อยู่ใน memory (ครั้งแรกหลังเปิด process)
+        changed = set(changes['added']) | set(changes['modified'])
+        to_load = [
+            path for path in files
+            if path in changed or (path not in redlines and new_entries[path]['bbox'] is not None)
+        ]
+        for path in changes['removed']:
+            redlines.pop(path, None)
+        if to_load:
+            loaded = {rl['path']: rl for rl in load_redline_geoms(to_load, cache_dir=catalog['geom_cache_dir'])}
+            for path in to_load:
+                rl = loaded.get(path)
+                if rl is None:
+                    redlines.pop(path, None)
+                    new_entries[path]['bbox'] = None
+                    continue
+                redlines[path] = rl
+                new_entries[path]['bbox'] = [float(v) for v in shapely.bounds(rl['geom'])]
+
+        entries_changed = new_entries != entries or files != catalog['files']
+        index_changed = force or any(changes.values()) or files != catalog['files']
+        catalog['entries'] = new_entries
+        catalog['files'] = files
+        if index_changed:
+            redline_geoms = [redlines[path] for path in files if path in redlines]
+            # ชื่อต้องคิดจากทั้งชุด (load_redline_geoms ข้างบนโหลดแค่ไฟล์ที่เปลี่ยน)
+            for rl, name in zip(redline_geoms, redline_display_names([rl['path'] for rl in redline_geoms])):
+                rl['name'] = name
+            catalog['fingerprint'] = fingerprint_from_hashes((path, new_entries[path]['sha1']) for path in files)
+            index = None
+            if redline_geoms:
+                index = build_redline_index(redline_geoms, epsgs=catalog['epsgs'])
+                index['fingerprint'] = catalog['fingerprint']
+            catalog['index'] = index
+            catalog['version'] += 1
+            catalog['updated_at'] = datetime.now().isoformat(timespec="seconds")
+        if entries_changed or index_changed:
+            _save_catalog_entries(catalog)
+
+    if any(changes.values()):
+        logging.info(
+            "redline catalog: เพิ่ม %d, แก้ %d, ลบ %d ไฟล์ -> %d เส้น",
+            len(changes['added']), len(changes['modified']), len(changes['removed']), len(redlines)
+        )
+    return changes
+
+
+def start_catalog_watcher(catalog, interval_s=DEFAULT_WATCH_INTERVAL_S, on_change=None):
+    """
+    thread เบื้องหลังที่ refresh catalog ทุก interval_s วินาที (polling ด้วย stat ไม่ต้องพึ่ง library เฝ้าไฟล์)
+    on_change(catalog, changes): เรียกเมื่อมีไฟล์เปลี่ยน
+    คืนค่า threading.Event - set() เพื่อหยุด
+    """
+    stop_event = threading.Event()
+
+    def watch():
+        while not stop_event.wait(interval_s):
+            try:
+                changes = refresh_redline_catalog(catalog)
+            except Exception:
+                logging.exception("refresh redline catalog ไม่สำเร็จ - ลองใหม่รอบหน้า")
+                continue
+            if on_change is not None and any(changes.values()):
+                on_change(catalog, changes)
+
+    threading.Thread(target=watch, name="redline-catalog-watcher", daemon=True).start()
+    return stop_event
@@ -0,0 +1,176 @@
+import os
+import json
+import shutil
+import tempfile
+import hashlib
+import logging
+
+import pandas as pd
+
+from .geom_cache import file_sha1
+
+# โฟลเดอร์เก็บผลวิเคราะห์ที่เคยรัน (1 โฟลเดอร์ย่อยต่อ key)
+DEFAULT_RESULT_CACHE_DIR = ".cache/results"
+# ขนาดรวมสูงสุดของ cache บน disk - เกินแล้วจะลบอันที่ใช้ล่าสุดนานที่สุดออกก่อน (LRU)
+DEFAULT_RESULT_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# เปลี่ยนค่านี้เมื่อรูปแบบผลลัพธ์เปลี่ยน เพื่อไม่ให้ใช้ cache เก่า
+_RESULT_FORMAT_VERSION = 2
+
+_SWEEP_FILE = "sweep.pkl"
+_META_FILE = "meta.json"
+
+
+def source_sha1(source):
+    """SHA-1 ของไฟล์ points: path, bytes หรือ file-like (เช่น UploadedFile)"""
+    if isinstance(source, (str, os.PathLike)):
+        return file_sha1(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha1(source).hexdigest()
+    if hasattr(source, "getbuffer"):
+        return hashlib.sha1(source.getbuffer()).hexdigest()
+    h = hashlib.sha1()
+    source.seek(0)
+    for block in iter(lambda: source.read(1 << 20), b""):
+        h.update(block)
+    source.seek(0)
+    return h.hexdigest()
+
+
+def points_set_fingerprint(points_grouped):
+    """fingerprint ของชุดไฟล์ points (ชื่อกลุ่ม + SHA-1 ของเนื้อหาแต่ละไฟล์ตามลำดับ)"""
+    payload = [[group, source_sha1(src)] for group, src in points_grouped.items()]
+    return hashlib.sha1(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+def result_cache_key(points_fingerprint, threshold_m, redline_fingerprint, search_radius_m=None):
+    """
+    key ของผลวิเคราะห์ = hash ของ (fingerprint ไฟล์ points ดู points_set_fingerprint, threshold, fingerprint ชุด redlines)
+    ชื่อไฟล์/ที่อยู่ไฟล์ไม่มีผล ถ้าเนื้อหาเหมือนเดิมก็ได้ key เดิม
+    search_radius_m: ระยะค้นหา nearest (ถ้ากำหนด) - ผล nearest ของจุดไกลๆ ต่างกันจึงต้องอยู่ใน key
+    """
+    payload = {
+        "version": _RESULT_FORMAT_VERSION,
+        "points": points_fingerprint,
+        "threshold_m": float(threshold_m),
+        "redlines": redline_fingerprint,
+    }
+    if search_radius_m is not None:
+        payload["search_radius_m"] = float(search_radius_m)
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def sweep_cache_key(points_fingerprint, max_radius_m, redline_fingerprint, search_radius_m=None):
+    """
+    key ของผล sweep (ดู compute_threshold_sweep) = hash ของ (fingerprint ไฟล์ points, max radius, fingerprint ชุด redlines,
+    search radius) - อัปโหลดไฟล์เดิมด้วยระยะเดิมซ้ำได้ผลจาก cache ทันทีโดยไม่ต้องคำนวณใหม่
+    """
+    payload = {
+        "version": _RESULT_FORMAT_VERSION,
+        "kind": "sweep",
+        "points": points_fingerprint,
+        "max_radius_m": float(max_radius_m),
+        "redlines": redline_fingerprint,
+        "search_radius_m": float(search_radius_m) if search_radius_m is not None else None,
+    }
+    return hashlib.sha1(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _dir_size(path):
+    return sum(
+        os.path.getsize(os.path.join(root, f))
+        for root, _, files in os.walk(path) for f in files
+    )
+
+
+def _read_entry_meta(entry_dir):
+    meta_path = os.path.join(entry_dir, _META_FILE)
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _put_entry(key, write_files, meta, cache_dir, max_bytes):
+    """
+    เขียน entry ลง temp dir (write_files(tmp_dir) เขียนไฟล์ข้อมูล) แล้วสลับเข้าที่ทีเดียว
+    จากนั้นลบ entry เก่าจนขนาดรวมไม่เกิน max_bytes
+    """
+    os.makedirs(cache_dir, exist_ok=True)
+    entry_dir = os.path.join(cache_dir, key)
+    tmp_dir = tempfile.mkdtemp(prefix=key + ".", suffix=".tmp", dir=cache_dir)
+    write_files(tmp_dir)
+    with open(os.path.join(tmp_dir, _META_FILE), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False)
+    shutil.rmtree(entry_dir, ignore_errors=True)
+    os.replace(tmp_dir, entry_dir)
+    evict_result_cache(cache_dir, max_bytes)
+
+
+def get_cached_result(key, cache_dir=DEFAULT_RESULT_CACHE_DIR):
+    """
+    คืน (xlsx_bytes, xlsx_name) ถ้ามีใน cache ไม่งั้นคืน None
+    การอ่านจะอัปเดตเวลาใช้งานล่าสุดของ entry (สำหรับ LRU)
+    """
+    entry_dir = os.path.join(cache_dir, key)
+    try:
+        meta = _read_entry_meta(entry_dir)
+        if meta is None:
+            return None
+        with open(os.path.join(entry_dir, meta["xlsx_file"]), "rb") as f:
+            xlsx_bytes = f.read()
+    except Exception as e:
+        logging.warning("result cache %s เสีย (%s) - ลบทิ้ง", key, e)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+    os.utime(os.path.join(entry_dir, _META_FILE))
+    return xlsx_bytes, meta["xlsx_name"]
+
+
+def put_cached_result(key, xlsx_path, cache_dir=DEFAULT_RESULT_CACHE_DIR, max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES):
+    """เก็บไฟล์ xlsx ลง cache แล้วลบ entry เก่าจนขนาดรวมไม่เกิน max_bytes"""
+    _put_entry(
+        key, lambda tmp_dir: shutil.copyfile(xlsx_path, os.path.join(tmp_dir, "result.xlsx")),
+        {"xlsx_file": "result.xlsx", "xlsx_name": os.path.basename(xlsx_path)}, cache_dir, max_bytes
+    )
+
+
+def get_cached_sweep(key, cache_dir=DEFAULT_RESULT_CACHE_DIR):
+    """คืนผล sweep ที่เก็บไว้ด้วย put_cached_sweep (key จาก sweep_cache_key) หรือ None ถ้าไม่มี"""
+    entry_dir = os.path.join(cache_dir, key)
+    try:
+        if _read_entry_meta(entry_dir) is None:
+            return None
+        sweep_result = pd.read_pickle(os.path.join(entry_dir, _SWEEP_FILE))
+    except Exception as e:
+        logging.warning("result cache %s เสีย (%s) - ลบทิ้ง", key, e)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+        return None
+    os.utime(os.path.join(entry_dir, _META_FILE))
+    return sweep_result
+
+
+def put_cached_sweep(key, sweep_result, cache_dir=DEFAULT_RESULT_CACHE_DIR, max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES):
+    """เก็บผล sweep (object ที่ pickle ได้ เช่นผลของงาน run_sweep_job) ลง cache"""
+    _put_entry(
+        key, lambda tmp_dir: pd.to_pickle(sweep_result, os.path.join(tmp_dir, _SWEEP_FILE)),
+        {"sweep_file": _SWEEP_FILE}, cache_dir, max_bytes
+    )
+
+
+def evict_result_cache(cache_dir=DEFAULT_RESULT_CACHE_DIR, max_bytes=DEFAULT_RESULT_CACHE_MAX_BYTES):
+    """ลบ entry ที่ใช้งานล่าสุดนานที่สุดออกก่อน จนขนาดรวมไม่เกิน max_bytes"""
+    entries = []
+    for name in os.listdir(cache_dir):
+        if name.endswith(".tmp"):
+            continue
+        meta_path = os.path.join(cache_dir, name, _META_FILE)
+        if os.path.exists(meta_path):
+            entries.append((os.path.getmtime(meta_path), _dir_size(os.path.join(cache_dir, name)), name))
+    total = sum(size for _, size, _ in entries)
+    for _, size, name in sorted(entries):
+        if total <= max_bytes:
+            break
+        shutil.rmtree(os.path.join(cache_dir, name), ignore_errors=True)
+        total -= size
+        logging.info("result cache: ลบ %s (LRU)", name)
@@ -0,0 +1,193 @@
+import os
+import logging
+import sqlite3
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyproj import CRS
+
+# รูปแบบไฟล์ที่รองรับ (parquet เป็นหลัก, csv / gpkg เลือกเพิ่มได้)
+COLUMNAR_FORMATS = ("parquet", "csv", "gpkg")
+# partition ได้ตามเส้น (redline) หรือกลุ่มไฟล์ points (group), None = ไฟล์เดียว
+PARTITION_OPTIONS = ("redline", "group", None)
+
+_GPKG_APPLICATION_ID = 0x47504B47  # "GPKG"
+_GPKG_USER_VERSION = 10200
+_WGS84_SRS_ID = 4326
+
+
+def _to_arrow(df, partition_by=None):
+    """
+    DataFrame -> pyarrow.Table (category -> dictionary, ไม่เก็บ index)
+    ถ้ามีคอลัมน์ partition_by จะเพิ่มคอลัมน์ <partition_by>_id (code ของ category) ไว้ใช้แบ่งโฟลเดอร์
+    (ชื่อเส้นภาษาไทยเมื่อ encode เป็นชื่อโฟลเดอร์ยาวเกินที่ระบบไฟล์รับได้ - ชื่อเต็มยังอยู่ในข้อมูล)
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    if partition_by in df.columns:
+        codes = pd.Categorical(df[partition_by]).codes.astype(np.int32)
+        table = table.append_column(f"{partition_by}_id", pa.array(codes))
+    return table
+
+
+def _write_dataset(table, base_dir, file_format, partition_col):
+    """เขียนตารางเป็น dataset (แยกโฟลเดอร์แบบ hive: <partition_col>=<value>/part-0.<format> ถ้ามี partition)"""
+    if partition_col:
+        # เรียงตาม partition ก่อน -> แต่ละโฟลเดอร์ได้ row group ใหญ่ต่อเนื่อง แทนชิ้นเล็กๆ จำนวนมาก
+        table = table.sort_by(partition_col)
+    ds.write_dataset(
+        table,
+        base_dir,
+        format=file_format,
+        partitioning=[partition_col] if partition_col else None,
+        partitioning_flavor="hive" if partition_col else None,
+        basename_template="part-{i}." + file_format,
+        existing_data_behavior="delete_matching",
+    )
+
+
+# GeoPackage point blob: header 'GP' (version 0, flags=little-endian ไม่มี envelope) + srs_id + WKB Point (little-endian)
+_GPKG_POINT_DTYPE = np.dtype([
+    ("magic", "S2"), ("version", "u1"), ("flags", "u1"), ("srs_id", "<i4"),
+    ("byte_order", "u1"), ("wkb_type", "<u4"), ("x", "<f8"), ("y", "<f8"),
+])
+
+
+def write_table_dataset(df, base_dir, file_format="parquet", partition_by=None):
+    """เขียน DataFrame เดียวเป็น dataset parquet / csv (partition_by: ชื่อคอลัมน์ category หรือ None)"""
+    table = _to_arrow(df, partition_by)
+    partition_col = f"{partition_by}_id" if f"{partition_by}_id" in table.column_names else None
+    _write_dataset(table, base_dir, file_format, partition_col)
+    return base_dir
+
+
+def _gpkg_geometry_blobs(lons, lats):
+    """จุด lon/lat -> list ของ GeoPackage geometry blob (สร้างทั้งก้อนด้วย numpy ไม่ผ่าน shapely ทีละจุด)"""
+    blobs = np.zeros(len(lons), dtype=_GPKG_POINT_DTYPE)
+    blobs["magic"] = b"GP"
+    blobs["flags"] = 1
+    blobs["srs_id"] = _WGS84_SRS_ID
+    blobs["byte_order"] = 1
+    blobs["wkb_type"] = 1
+    blobs["x"] = lons
+    blobs["y"] = lats
+    buf = blobs.tobytes()
+    size = _GPKG_POINT_DTYPE.itemsize
+    return [buf[i:i + size] for i in range(0, len(buf), size)]
+
+
+def _sqlite_type(dtype):
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+        return "INTEGER"
+    if pd.api.types.is_float_dtype(dtype):
+        return "REAL"
+    return "TEXT"
+
+
+def _write_gpkg_layer(conn, layer, df):
+    """เขียน DataFrame ที่มีคอลัมน์ lat/lon เป็น point layer ใน GeoPackage"""
+    columns = list(df.columns)
+    column_defs = ", ".join(f'"{col}" {_sqlite_type(df[col].dtype)}' for col in columns)
+    conn.execute(f'CREATE TABLE "{layer}" (fid INTEGER PRIMARY KEY AUTOINCREMENT, geom POINT, {column_defs})')
+
+    lons = df["lon"].to_numpy(dtype=np.float64)
+    lats = df["lat"].to_numpy(dtype=np.float64)
+    values = [
+        df[col].astype(object).where(df[col].notna(), None).tolist()
+        if not pd.api.types.is_float_dtype(df[col].dtype) else df[col].tolist()
+        for col in columns
+    ]
+    placeholders = ", ".join("?" * (len(columns) + 1))
+    quoted = ", ".join(f'"{col}"' for col in columns)
+    conn.executemany(
+        f'INSERT INTO "{layer}" (geom, {quoted}) VALUES ({placeholders})',
+        zip(_gpkg_geometry_blobs(lons, lats), *values),
+    )
+
+    bounds = (lons.min(), lats.min(), lons.max(), lats.max()) if len(df) else (None, None, None, None)
+    conn.execute(
+        "INSERT INTO gpkg_contents (table_name, data_type, identifier, last_change, min_x, min_y, max_x, max_y, srs_id)"
+        " VALUES (?, 'features', ?, ?, ?, ?, ?, ?, ?)",
+        (layer, layer, datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.000Z"), *bounds, _WGS84_SRS_ID),
+    )
+    conn.execute(
+        "INSERT INTO gpkg_geometry_columns (table_name, column_name, geometry_type_name, srs_id, z, m)"
+        " VALUES (?, 'geom', 'POINT', ?, 0, 0)",
+        (layer, _WGS84_SRS_ID),
+    )
+
+
+def write_gpkg(path, layers):
+    """
+    เขียน GeoPackage (SQLite) ด้วย sqlite3 ของ Python เอง ไม่ต้องใช้ GDAL
+    layers: dict layer_name -> DataFrame (ต้องมีคอลัมน์ lat/lon, WGS84)
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute(f"PRAGMA application_id = {_GPKG_APPLICATION_ID}")
+        conn.execute(f"PRAGMA user_version = {_GPKG_USER_VERSION}")
+        # ไฟล์สร้างใหม่ทั้งไฟล์ ถ้าล้มกลางทางก็เขียนใหม่ -> ไม่ต้องใช้ journal
+        conn.execute("PRAGMA journal_mode = OFF")
+        conn.execute("PRAGMA synchronous = OFF")
+        conn.executescript("""
+            CREATE TABLE gpkg_spatial_ref_sys (
+                srs_name TEXT NOT NULL, srs_id INTEGER PRIMARY KEY, organization TEXT NOT NULL,
+                organization_coordsys_id INTEGER NOT NULL, definition TEXT NOT NULL, description TEXT);
+            CREATE TABLE gpkg_contents (
+                table_name TEXT NOT NULL PRIMARY KEY, data_type TEXT NOT NULL, identifier TEXT UNIQUE,
+                description TEXT DEFAULT '', last_change DATETIME NOT NULL,
+                min_x DOUBLE, min_y DOUBLE, max_x DOUBLE, max_y DOUBLE,
+                srs_id INTEGER, CONSTRAINT fk_gc_r_srs_id FOREIGN KEY (srs_id) REFERENCES gpkg_spatial_ref_sys(srs_id));
+            CREATE TABLE gpkg_geometry_columns (
+                table_name TEXT NOT NULL, column_name TEXT NOT NULL, geometry_type_name TEXT NOT NULL,
+                srs_id INTEGER NOT NULL, z TINYINT NOT NULL, m TINYINT NOT NULL,
+                CONSTRAINT pk_geom_cols PRIMARY KEY (table_name, column_name));
+        """)
+        conn.executemany(
+            "INSERT INTO gpkg_spatial_ref_sys VALUES (?, ?, ?, ?, ?, ?)",
+            [
+                ("Undefined cartesian SRS", -1, "NONE", -1, "undefined", None),
+                ("Undefined geographic SRS", 0, "NONE", 0, "undefined", None),
+                ("WGS 84 geodetic", _WGS84_SRS_ID, "EPSG", 4326, CRS.from_epsg(_WGS84_SRS_ID).to_wkt(), None),
+            ],
+        )
+        for layer, df in layers.items():
+            _write_gpkg_layer(conn, layer, df)
+        conn.commit()
+    finally:
+        conn.close()
+    return path
+
+
+def write_results_columnar(points_df, matches_df, output_dir, formats=("parquet",), partition_by="redline"):
+    """
+    เขียนผลเป็นไฟล์แบบ columnar (ทางเลือกคู่กับ write_results_to_excel - ไม่มีข้อจำกัดจำนวน sheet / แถว)
+      - points_df: ผลต่อจุด (จาก analyze_points_vs_redlines / summarize_at_threshold)
+      - matches_df: ตาราง matches แบบ long-format 1 แถวต่อคู่ (จุด, redline) (ดู matches_table_at_threshold)
+      - formats: เลือกจาก COLUMNAR_FORMATS
+          parquet / csv -> <output_dir>/<format>/{points,matches}/ (แยกโฟลเดอร์ <col>_id=<code> ถ้ามี partition)
+          gpkg          -> <output_dir>/results.gpkg (layer points, matches - ไม่แบ่ง partition)
+      - partition_by: 'redline' (matches แยกตามเส้น), 'group' (ทั้ง points และ matches แยกตามกลุ่ม) หรือ None
+    คืนค่า list ของ path ที่เขียน
+    """
+    unknown = [fmt for fmt in formats if fmt not in COLUMNAR_FORMATS]
+    if unknown:
+        raise ValueError(f"ไม่รองรับรูปแบบไฟล์: {unknown} (ใช้ได้: {COLUMNAR_FORMATS})")
+    if partition_by not in PARTITION_OPTIONS:
+        raise ValueError(f"partition_by ต้องเป็นหนึ่งใน {PARTITION_OPTIONS}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    written = []
+    for fmt in formats:
+        if fmt == "gpkg":
+            written.append(write_gpkg(os.path.join(output_dir, "results.gpkg"), {"points": points_df, "matches": matches_df}))
+            continue
+        for name, df in (("points", points_df), ("matches", matches_df)):
+            written.append(write_table_dataset(df, os.path.join(output_dir, fmt, name), fmt, partition_by))
+
+    logging.info("บันทึกผลแบบ columnar (%s) ที่: %s", ", ".join(formats), output_dir)
+    return written
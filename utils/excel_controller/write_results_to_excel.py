@@ -1,20 +1,118 @@
 import os
+import math
 import logging
 from collections import defaultdict
 from tqdm import tqdm
 
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 
 from shapely.geometry import LineString, Point, MultiLineString, GeometryCollection
 from shapely.ops import unary_union, transform
 
-from openpyxl import load_workbook
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, Border, Side, Alignment
 from openpyxl.utils import get_column_letter
 
 from pyproj import CRS, Transformer
 from datetime import datetime
 
+# รูปแบบหัวตารางแบบเดียวกับที่ pandas.to_excel ใช้ (ตัวหนา กรอบบาง จัดกลาง)
+_HEADER_FONT = Font(bold=True)
+_HEADER_BORDER = Border(left=Side(style="thin"), right=Side(style="thin"), top=Side(style="thin"), bottom=Side(style="thin"))
+_HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="top")
+_SUMMARY_SHEET = "points_summary"
+_MAIN_SIGNS = ['Close Action', 'Confirm', 'Revise']
+# ชื่อคอลัมน์ภายในของตาราง matches ที่บอกว่าแถวนั้นเป็นของเส้นไหน (ไม่ได้เขียนลง sheet)
+_REDLINE_KEY = '__redline__'
+
+
+def _excel_value(value):
+    """แปลงค่าแบบเดียวกับ pandas.to_excel (NaN -> ช่องว่าง, inf -> 'inf')"""
+    if isinstance(value, float):
+        if math.isnan(value):
+            return ""
+        if math.isinf(value):
+            return "inf" if value > 0 else "-inf"
+    return value
+
+
+def _header_cells(ws, columns):
+    cells = []
+    for col in columns:
+        cell = WriteOnlyCell(ws, value=col)
+        cell.font = _HEADER_FONT
+        cell.border = _HEADER_BORDER
+        cell.alignment = _HEADER_ALIGNMENT
+        cells.append(cell)
+    return cells
+
+
+def append_dataframe_sheet(wb, sheet_name, df):
+    """เขียน DataFrame เป็น sheet ใหม่แบบ streaming (write-only) ทีละแถว"""
+    ws = wb.create_sheet(sheet_name)
+    ws.append(_header_cells(ws, df.columns))
+    for row in df.itertuples(index=False, name=None):
+        ws.append([_excel_value(v) for v in row])
+    return ws
+
+
+def _matches_table(redline_summary):
+    """
+    รวม raw_matches ของทุกเส้นเป็น DataFrame เดียว (long-format) + คอลัมน์ _REDLINE_KEY (category ตามลำดับเส้น)
+    คืนค่า (matches_df, offsets) โดยแถวของเส้นที่ i อยู่ที่ช่วง offsets[i]:offsets[i+1]
+    """
+    redline_names = list(redline_summary)
+    counts = [len(info['raw_matches']) for info in redline_summary.values()]
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    matches_df = pd.DataFrame.from_records(
+        [r for info in redline_summary.values() for r in info['raw_matches']]
+    )
+    matches_df[_REDLINE_KEY] = pd.Categorical.from_codes(
+        np.repeat(np.arange(len(redline_names)), counts), categories=redline_names
+    )
+    return matches_df, offsets
+
+
+def _redline_sheet_names(redline_summary):
+    """
+    ชื่อ sheet ของแต่ละเส้นที่มี match (ตามลำดับที่จะเขียน) -> dict rl_name -> sheet_name
+    sheet name จำกัด 31 chars และไม่ใช้อักขระพิเศษ, ชื่อซ้ำต่อท้ายด้วย _1, _2, ...
+    """
+    sheet_names = {}
+    existing_sheets = [_SUMMARY_SHEET]
+    for rl_name, info in redline_summary.items():
+        if not info['raw_matches']:
+            continue
+        safe_name = rl_name.replace('/', '_').replace('\\', '_').replace(':', '_')
+        sheet_name = (safe_name[:28] + '...') if len(safe_name) > 31 else safe_name
+
+        # ตรวจชื่อซ้ำ
+        if sheet_name in existing_sheets:
+            suffix = 1
+            base_name = safe_name[:25] if len(safe_name) > 25 else safe_name
+            while sheet_name in existing_sheets:
+                sheet_name = f"{base_name}_{suffix}"
+                suffix += 1
+        existing_sheets.append(sheet_name)
+        sheet_names[rl_name] = sheet_name
+    return sheet_names
+
+
+def _hyperlink_target(rl_name, sheetnames):
+    """ค้นหา sheet name ที่ตรงกับ rl_name หรือแบบตัด (None ถ้าไม่มี)"""
+    safe_name = rl_name.replace('/', '_').replace('\\', '_').replace(':', '_')
+    if safe_name in sheetnames:
+        return safe_name
+    for sname in sheetnames:
+        if sname.startswith(safe_name[:25]):
+            return sname
+    return None
+
+
 def write_results_to_excel(points_df, redline_summary, threshold_m, output_path=None, use_detail_count=False):
     """
     เขียนผลไปเป็น Excel:
@@ -31,49 +129,35 @@ def write_results_to_excel(points_df, redline_summary, threshold_m, output_path=
         count_type = "details" if use_detail_count else "coords"
         output_path = f"results_points_redlines_{threshold_m}m_{count_type}_{timestamp}.xlsx"
 
-    # สร้าง DataFrame สรุป
-    summary_rows = []
-    for rl_name, info in redline_summary.items():
-        # เลือกใช้ points แบบไหน สำหรับการนับใน summary
-        # if use_detail_count:
-        pts_for_summary = info['raw_matches']
-        # else:
-        #     pts_for_summary = info['points']
-        ##############################################################################
-        
-        # ใช้ raw_matches สำหรับการแสดงจำนวนจริงใน detail sheet
-        raw_matches = info['raw_matches']
-        
-        # ใช้ pts_for_summary สำหรับการนับประเภท (เพื่อไม่ให้นับซ้ำ)
-        df_summary = pd.DataFrame(pts_for_summary)
-        df_raw = pd.DataFrame(raw_matches) if raw_matches else pd.DataFrame()
-        
-        # นับแต่ละประเภทจาก summary data (ไม่ซ้ำ)
-        close_action_count = (df_summary['sign'] == 'Close Action').sum() if 'sign' in df_summary.columns else 0
-        confirm_count = (df_summary['sign'] == 'Confirm').sum() if 'sign' in df_summary.columns else 0
-        revise_count = (df_summary['sign'] == 'Revise').sum() if 'sign' in df_summary.columns else 0
-        
-        # จุดที่เหลือ (ไม่ใช่ 3 ประเภทหลัก)
-        main_categories = ['Close Action', 'Confirm', 'Revise']
-        other_count = len(df_summary) - close_action_count - confirm_count - revise_count
-        
+    # ตาราง matches แบบ long-format ตารางเดียว (1 แถวต่อ match, เรียงตามลำดับเส้น) ใช้ทั้ง summary / detail / statistics
+    redline_names = list(redline_summary)
+    matches_df, offsets = _matches_table(redline_summary)
+
+    # สร้าง DataFrame สรุป - นับ Close Action / Confirm / Revise และระยะเฉลี่ยด้วย groupby รอบเดียว
+    # (นับจาก raw_matches ทั้งหมด รวมจุดซ้ำ)
+    totals = np.diff(offsets)
+    if len(matches_df):
+        by_redline = matches_df.groupby(_REDLINE_KEY, observed=False, sort=False)
+        sign_counts = (
+            matches_df.groupby([_REDLINE_KEY, 'sign'], observed=True).size()
+            .unstack(fill_value=0)
+            .reindex(index=redline_names, columns=_MAIN_SIGNS, fill_value=0)
+        )
+        avg_distance = by_redline['distance_m'].mean().reindex(redline_names).fillna(0).round(2)
+    else:
+        sign_counts = pd.DataFrame(0, index=redline_names, columns=_MAIN_SIGNS)
+        avg_distance = pd.Series(0.0, index=redline_names)
+
+    summary_df = pd.DataFrame({
+        "เส้นสายไฟ": redline_names,
+        "จำนวนจุดทั้งหมด": totals,
+        "Close Action": sign_counts['Close Action'].to_numpy(),
+        "Confirm": sign_counts['Confirm'].to_numpy(),
+        "Revise": sign_counts['Revise'].to_numpy(),
         # จุดที่เหลือ (ไม่ใช่ 3 ประเภทหลัก)
-        other_count = len(df_summary) - close_action_count - confirm_count - revise_count
-
-        # คำนวณระยะเฉลี่ย
-        avg_distance = df_raw['distance_m'].mean() if 'distance_m' in df_raw.columns and len(df_raw) > 0 else 0
-
-        summary_rows.append({
-            "เส้นสายไฟ": rl_name,
-            "จำนวนจุดทั้งหมด": len(df_summary),
-            "Close Action": close_action_count,
-            "Confirm": confirm_count,
-            "Revise": revise_count,
-            "อื่นๆ": other_count,
-            "ระยะเฉลี่ย (m)": round(avg_distance, 2)
-        })
-
-    summary_df = pd.DataFrame(summary_rows)
+        "อื่นๆ": totals - sign_counts.to_numpy().sum(axis=1),
+        "ระยะเฉลี่ย (m)": avg_distance.to_numpy(),
+    })
     
     total_row = {
         "เส้นสายไฟ": "รวมทั้งหมด",
@@ -86,110 +170,57 @@ def write_results_to_excel(points_df, redline_summary, threshold_m, output_path=
     }
     summary_df = pd.concat([summary_df, pd.DataFrame([total_row])], ignore_index=True)
 
-    # เขียนลง Excel
-    with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-        # เขียน Summary
-        summary_df.to_excel(writer, sheet_name="points_summary", index=False)
-
-        # เขียนแต่ละเส้น - ใช้ raw_matches (ข้อมูลทั้งหมดรวมซ้ำ)
-        for rl_name, info in redline_summary.items():
-            # ใช้ raw_matches ที่มีข้อมูลทั้งหมดรวมซ้ำ
-            all_matches = info['raw_matches']
-            if not all_matches:
-                continue
-
-            df = pd.DataFrame(all_matches)
-            
-            # เรียงข้อมูลตาม distance_m
-            if 'distance_m' in df.columns:
-                df = df.sort_values('distance_m')
-
-            # sheet name จำกัด 31 chars และไม่ใช้อักขระพิเศษ
-            safe_name = rl_name.replace('/', '_').replace('\\', '_').replace(':', '_')
-            sheet_name = (safe_name[:28] + '...') if len(safe_name) > 31 else safe_name
-
-            # ตรวจชื่อซ้ำ
-            existing_sheets = writer.book.sheetnames
-            if sheet_name in existing_sheets:
-                suffix = 1
-                base_name = safe_name[:25] if len(safe_name) > 25 else safe_name
-                while sheet_name in existing_sheets:
-                    sheet_name = f"{base_name}_{suffix}"
-                    suffix += 1
-
-            # เขียนรายละเอียด
-            df.to_excel(writer, sheet_name=sheet_name, index=False)
-
-        # เขียนข้อมูลสถิติเพิ่มเติม
-        stats_data = []
-        for rl_name, info in redline_summary.items():
-            stats_data.append({
-                "เส้นสายไฟ": rl_name,
-                "Count by Coordinates": info['count_by_coords'],
-                "Count by Details": info['count_by_details'], 
-                "Total Matches": info['total_matches'],
-                "Duplicate Rate (%)": round(
-                    ((info['total_matches'] - info['count_by_coords']) / info['total_matches'] * 100) 
-                    if info['total_matches'] > 0 else 0, 2
-                )
-            })
-        
-        stats_df = pd.DataFrame(stats_data)
-        stats_df.to_excel(writer, sheet_name="statistics", index=False)
-
-    # โหลด workbook เพื่อเพิ่ม Hyperlink และจัดรูปแบบ
-    wb = load_workbook(output_path)
-    ws_summary = wb["points_summary"]
-
-    # เพิ่ม Hyperlink (ยกเว้นแถวสุดท้ายที่เป็น "รวมทั้งหมด")
-    for row_idx in range(2, len(summary_df)):  # ไม่รวมแถวสุดท้าย
-        rl_name = ws_summary.cell(row=row_idx, column=1).value
-        if rl_name == "รวมทั้งหมด":
-            continue
-            
-        # ค้นหา sheet name ที่ตรงกับ rl_name หรือแบบตัด
-        target_sheet = None
-        safe_name = rl_name.replace('/', '_').replace('\\', '_').replace(':', '_')
-        
-        if safe_name in wb.sheetnames:
-            target_sheet = safe_name
-        else:
-            # ค้นหาชื่อที่ตัดแล้ว
-            for sname in wb.sheetnames:
-                if sname.startswith(safe_name[:25]):
-                    target_sheet = sname
-                    break
+    # ชื่อ sheet ทั้งหมดรู้ล่วงหน้า -> ใส่ hyperlink ได้ตั้งแต่เขียน summary (ไม่ต้องโหลดไฟล์กลับมาแก้)
+    redline_sheets = _redline_sheet_names(redline_summary)
+    sheetnames = [_SUMMARY_SHEET] + list(redline_sheets.values()) + ["statistics"]
 
+    # เขียนลง Excel แบบ write-only: ทุก sheet เขียนเป็น stream รอบเดียว ไม่ถือทั้ง workbook ไว้ใน memory
+    wb = Workbook(write_only=True)
+
+    # เขียน Summary พร้อม Hyperlink
+    # (ยกเว้นแถวสุดท้ายที่เป็น "รวมทั้งหมด" - และเหมือนเดิมคือแถวก่อนหน้านั้นก็ไม่มี link)
+    ws_summary = wb.create_sheet(_SUMMARY_SHEET)
+    ws_summary.append(_header_cells(ws_summary, summary_df.columns))
+    for i, row in enumerate(summary_df.itertuples(index=False, name=None)):
+        values = [_excel_value(v) for v in row]
+        rl_name = values[0]
+        target_sheet = None
+        if i < len(summary_df) - 2 and rl_name != "รวมทั้งหมด":
+            target_sheet = _hyperlink_target(rl_name, sheetnames)
         if target_sheet:
-            cell = ws_summary.cell(row=row_idx, column=1)
+            cell = WriteOnlyCell(ws_summary, value=rl_name)
             cell.hyperlink = f"#'{target_sheet}'!A1"
             cell.style = "Hyperlink"
-
-    # # จัดรูปแบบแถว "รวมทั้งหมด"
-    # total_row_idx = len(summary_df) + 1
-    # for col in range(1, ws_summary.max_column + 1):
-    #     cell = ws_summary.cell(row=total_row_idx, column=col)
-    #     cell.font = Font(bold=True)
-    #     cell.fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-
-    # # ปรับความกว้างคอลัมน์
-    # for col in range(1, ws_summary.max_column + 1):
-    #     max_len = 0
-    #     col_letter = get_column_letter(col)
-    #     for cell in ws_summary[col_letter]:
-    #         try:
-    #             if cell.value:
-    #                 max_len = max(max_len, len(str(cell.value)))
-    #         except:
-    #             pass
-    #     ws_summary.column_dimensions[col_letter].width = max_len + 2
-
-    # # จัดรูปแบบ statistics sheet
-    # if "statistics" in wb.sheetnames:
-    #     ws_stats = wb["statistics"]
-    #     for col in range(1, ws_stats.max_column + 1):
-    #         col_letter = get_column_letter(col)
-    #         ws_stats.column_dimensions[col_letter].width = 20
+            values[0] = cell
+        ws_summary.append(values)
+
+    # เขียนแต่ละเส้น - ใช้ raw_matches (ข้อมูลทั้งหมดรวมซ้ำ) เป็นช่วงของตาราง matches เรียงตาม distance_m
+    detail_columns = [col for col in matches_df.columns if col != _REDLINE_KEY]
+    column_values = [matches_df[col].to_numpy() for col in detail_columns]
+    distances = matches_df['distance_m'].to_numpy() if len(matches_df) else None
+    for rl_idx, rl_name in enumerate(redline_names):
+        sheet_name = redline_sheets.get(rl_name)
+        if sheet_name is None:
+            continue
+        start, end = offsets[rl_idx], offsets[rl_idx + 1]
+        # argsort แบบเดียวกับ DataFrame.sort_values (quicksort) -> ลำดับแถวที่ระยะเท่ากันเหมือนเดิม
+        order = start + np.argsort(distances[start:end], kind='quicksort')
+        ws = wb.create_sheet(sheet_name)
+        ws.append(_header_cells(ws, detail_columns))
+        for row in zip(*(values[order].tolist() for values in column_values)):
+            ws.append([_excel_value(v) for v in row])
+
+    # เขียนข้อมูลสถิติเพิ่มเติม (คำนวณทั้งคอลัมน์จากตัวนับของแต่ละเส้น)
+    stats_df = pd.DataFrame.from_records(
+        [(info['count_by_coords'], info['count_by_details'], info['total_matches']) for info in redline_summary.values()],
+        columns=["Count by Coordinates", "Count by Details", "Total Matches"],
+    )
+    stats_df.insert(0, "เส้นสายไฟ", redline_names)
+    stats_df["Duplicate Rate (%)"] = [
+        round((total - coords) / total * 100, 2) if total > 0 else 0
+        for total, coords in zip(stats_df["Total Matches"].tolist(), stats_df["Count by Coordinates"].tolist())
+    ]
+    append_dataframe_sheet(wb, "statistics", stats_df)
 
     wb.save(output_path)
     
@@ -0,0 +1,241 @@
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+import shapely
+from shapely.strtree import STRtree
+
+from .redline_index import get_zone_index, expand_group_matches
+
+DEFAULT_CHUNK_SIZE = 10000
+# ใช้เส้นหยาบกรองก่อนเมื่อ threshold >= ค่านี้ × tolerance ของเส้นหยาบ
+# (threshold เล็ก window แคบอยู่แล้ว ค้น segment ละเอียดตรงๆ เร็วกว่า)
+_COARSE_MIN_THRESHOLD_RATIO = 50
+# เผื่อความคลาดเคลื่อนของ floating point ในขอบเขตระยะของเส้นหยาบ (เมตร)
+_COARSE_MARGIN_EPS_M = 1e-6
+
+
+def _nearest_per_point(zone, points, search_radius_m=None):
+    """
+    หา redline ที่ใกล้ที่สุดของทุกจุดใน chunk (ระยะเท่ากัน -> redline ลำดับแรก)
+    search_radius_m: ค้นเฉพาะ segment ที่ envelope (ขยายด้วยระยะนี้) ครอบจุด - จุดที่ไม่มีเส้นภายในระยะได้ -1 / inf
+    """
+    nearest_idx = np.full(len(points), -1, dtype=np.int64)
+    nearest_dist = np.full(len(points), np.inf)
+    (pt_idx, seg_idx), seg_dist = zone['tree'].query_nearest(
+        points, max_distance=search_radius_m, return_distance=True, all_matches=True
+    )
+    if len(pt_idx) == 0:
+        return nearest_idx, nearest_dist
+    owner = zone['owner'][seg_idx]
+    order = np.lexsort((owner, pt_idx))
+    first = order[np.r_[True, pt_idx[order][1:] != pt_idx[order][:-1]]]
+    nearest_idx[pt_idx[first]] = owner[first]
+    nearest_dist[pt_idx[first]] = seg_dist[first]
+    return nearest_idx, nearest_dist
+
+
+def _matches_within(zone, points, xs, ys, threshold_m):
+    """
+    หาคู่ (จุด, redline) ที่ระยะ <= threshold_m ของทุกจุดใน chunk
+    คืนค่า (pt_idx, redline_idx, distance) เรียงตามจุด แล้วตามลำดับ redline
+    """
+    coarse = zone.get('coarse')
+    if coarse is not None and threshold_m >= _COARSE_MIN_THRESHOLD_RATIO * coarse['tolerance_m']:
+        pt_idx, seg_idx = _fine_candidates(coarse, points, xs, ys, threshold_m)
+    else:
+        windows = shapely.box(xs - threshold_m, ys - threshold_m, xs + threshold_m, ys + threshold_m)
+        pt_idx, seg_idx = zone['tree'].query(windows)
+    dist = shapely.distance(points[pt_idx], zone['segments'][seg_idx])
+    keep = dist <= threshold_m
+    pt_idx, owner, dist = pt_idx[keep], zone['owner'][seg_idx[keep]], dist[keep]
+    if len(pt_idx) == 0:
+        return pt_idx, owner, dist
+
+    # ระยะของ redline = ระยะต่ำสุดของ segment ในเส้นนั้น
+    order = np.lexsort((dist, owner, pt_idx))
+    pt_idx, owner, dist = pt_idx[order], owner[order], dist[order]
+    first = np.r_[True, (pt_idx[1:] != pt_idx[:-1]) | (owner[1:] != owner[:-1])]
+    return pt_idx[first], owner[first], dist[first]
+
+
+def _fine_candidates(coarse, points, xs, ys, threshold_m):
+    """
+    coarse-to-fine: คู่ (จุด, segment ละเอียด) ที่ต้องคำนวณระยะจริง โดยใช้เส้นหยาบ (ดู simplify_segments) เป็นขอบเขต
+    ระยะจริงถึงช่วงละเอียดของ coarse segment c อยู่ใน d(c) ± tol จึงตัดได้:
+      - คู่ (จุด, redline) ที่ระยะหยาบต่ำสุด > threshold + tol (ไกลเกินแน่นอน)
+      - coarse segment ที่ d(c) > ระยะหยาบต่ำสุดของเส้นนั้น + 2 tol (ไม่มีทางเป็นช่วงที่ใกล้ที่สุด)
+    segment ที่ใกล้ที่สุดจริงของทุกคู่ที่ <= threshold ยังอยู่ครบ -> ผลเหมือนค้นจาก segment ละเอียดทั้งหมด
+    """
+    margin = coarse['tolerance_m'] + _COARSE_MARGIN_EPS_M
+    reach = threshold_m + margin
+    windows = shapely.box(xs - reach, ys - reach, xs + reach, ys + reach)
+    pt_idx, c_idx = coarse['tree'].query(windows)
+    dist = shapely.distance(points[pt_idx], coarse['segments'][c_idx])
+    keep = dist <= reach
+    pt_idx, c_idx, dist = pt_idx[keep], c_idx[keep], dist[keep]
+    if len(pt_idx) == 0:
+        return pt_idx, c_idx
+
+    owner = coarse['owner'][c_idx]
+    order = np.lexsort((dist, owner, pt_idx))
+    pt_idx, c_idx, owner, dist = pt_idx[order], c_idx[order], owner[order], dist[order]
+    first = np.r_[True, (pt_idx[1:] != pt_idx[:-1]) | (owner[1:] != owner[:-1])]
+    pair_min = dist[first][np.cumsum(first) - 1]
+    keep = dist <= np.minimum(pair_min + 2 * margin, reach)
+    pt_idx, c_idx = pt_idx[keep], c_idx[keep]
+
+    # กระจาย coarse segment -> segment ละเอียดในช่วง start:stop
+    start = coarse['start'][c_idx]
+    count = coarse['stop'][c_idx] - start
+    offsets = np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count)
+    return np.repeat(pt_idx, count), np.repeat(start, count) + offsets
+
+
+def _process_chunk(zone, xs, ys, threshold_m, search_radius_m=None):
+    """คำนวณ nearest + matches ของจุดหนึ่ง chunk ใน zone เดียว (pt_idx เป็น index ภายใน chunk)"""
+    points = shapely.points(xs, ys)
+    nearest_idx, nearest_dist = _nearest_per_point(zone, points, search_radius_m)
+    pt_idx, rl_idx, dist = _matches_within(zone, points, xs, ys, threshold_m)
+    return nearest_idx, nearest_dist, pt_idx, rl_idx, dist
+
+
+# ---------- multi-process ----------
+# zone ของ redline index ใน worker process (ได้จาก initializer ครั้งเดียวต่อ worker ไม่ใช่ต่อ task)
+_worker_zones = {}
+
+
+def _zones_payload(zones):
+    """แปลง zone เป็นข้อมูลที่ pickle ได้ (WKB ของ segment + owner และเส้นหยาบ) สำหรับ worker แบบ spawn"""
+    payload = {}
+    for epsg, zone in zones.items():
+        payload[epsg] = {'segments_wkb': shapely.to_wkb(zone['segments']), 'owner': zone['owner']}
+        if 'coarse' in zone:
+            payload[epsg]['coarse'] = {
+                **{key: zone['coarse'][key] for key in ('tolerance_m', 'owner', 'start', 'stop')},
+                'segments_wkb': shapely.to_wkb(zone['coarse']['segments']),
+            }
+    return payload
+
+
+def _init_worker(zones):
+    """
+    initializer ของ worker:
+    - fork: ได้ zone (รวม STRtree) จาก parent โดยตรง ไม่มีการ pickle
+    - spawn: ได้ WKB แล้วสร้าง STRtree ใหม่ครั้งเดียวต่อ worker
+    """
+    _worker_zones.clear()
+    for epsg, zone in zones.items():
+        if 'tree' not in zone:
+            payload = zone
+            segments = shapely.from_wkb(payload['segments_wkb'])
+            zone = {'epsg': epsg, 'segments': segments, 'owner': payload['owner'], 'tree': STRtree(segments)}
+            if 'coarse' in payload:
+                coarse = {key: value for key, value in payload['coarse'].items() if key != 'segments_wkb'}
+                coarse['segments'] = shapely.from_wkb(payload['coarse']['segments_wkb'])
+                coarse['tree'] = STRtree(coarse['segments'])
+                zone['coarse'] = coarse
+        _worker_zones[epsg] = zone
+
+
+def _run_chunk_task(epsg, xs, ys, threshold_m, search_radius_m):
+    return _process_chunk(_worker_zones[epsg], xs, ys, threshold_m, search_radius_m)
+
+
+def _make_pool(zones, workers):
+    if 'fork' in mp.get_all_start_methods():
+        return ProcessPoolExecutor(workers, mp_context=mp.get_context('fork'),
+                                   initializer=_init_worker, initargs=(zones,))
+    return ProcessPoolExecutor(workers, mp_context=mp.get_context('spawn'),
+                               initializer=_init_worker, initargs=(_zones_payload(zones),))
+
+
+def compute_bulk_distances(index, xs, ys, epsgs, threshold_m, chunk_size=DEFAULT_CHUNK_SIZE, progress_callback=None,
+                           workers=1, search_radius_m=None):
+    """
+    คำนวณระยะจากจุดทั้งหมด (project แล้ว ดู project_points_to_utm) ไปยัง redlines แบบ vectorized ทีละ chunk
+    คืนค่า dict:
+      - 'nearest_idx', 'nearest_dist': ต่อจุด (-1 / inf ถ้าไม่มี redline ใน zone หรือไม่มีภายใน search_radius_m)
+      - 'matched': bool ต่อจุด (มี redline อย่างน้อย 1 เส้นภายใน threshold)
+      - 'match_point', 'match_redline', 'match_dist': คู่ที่อยู่ภายใน threshold เรียงตามจุด แล้วตามลำดับ redline
+    progress_callback(fraction) จะถูกเรียกหลังจบแต่ละ chunk
+    workers: จำนวน process (1 = ทำใน process เดิม) - ผลลัพธ์เหมือนกันทุกค่า
+    search_radius_m: ระยะค้นหา nearest สูงสุด (ต้อง >= threshold_m) - ไม่ต้องคำนวณระยะจริงไปยังเส้นที่ไกลกว่านี้
+        None = หา nearest เสมอไม่ว่าจะไกลแค่ไหน (แบบเดิม)
+    """
+    if search_radius_m is not None and search_radius_m < threshold_m:
+        raise ValueError(f"search_radius_m ({search_radius_m}) ต้องไม่น้อยกว่า threshold_m ({threshold_m})")
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+    epsgs = np.asarray(epsgs)
+    total = len(xs)
+
+    nearest_idx = np.full(total, -1, dtype=np.int64)
+    nearest_dist = np.full(total, np.inf)
+
+    # แบ่งจุดเป็น chunk ตาม zone (zone ที่ไม่มี segment ข้ามได้เลย)
+    zones = {}
+    chunks = []
+    if workers > 1:
+        chunk_size = max(1, min(chunk_size, -(-total // (workers * 4))))
+    for epsg in np.unique(epsgs).tolist():
+        zone = get_zone_index(index, epsg)
+        zone_points = np.flatnonzero(epsgs == epsg)
+        if len(zone['segments']):
+            zones[epsg] = zone
+            chunks.extend((epsg, zone_points[i:i + chunk_size]) for i in range(0, len(zone_points), chunk_size))
+
+    results = [None] * len(chunks)
+    done = total - sum(len(chunk) for _, chunk in chunks)
+    if workers > 1 and len(chunks) > 1:
+        with _make_pool(zones, min(workers, len(chunks))) as pool:
+            futures = {
+                pool.submit(_run_chunk_task, epsg, xs[chunk], ys[chunk], threshold_m, search_radius_m): i
+                for i, (epsg, chunk) in enumerate(chunks)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                results[i] = future.result()
+                done += len(chunks[i][1])
+                if progress_callback is not None:
+                    progress_callback(done / total)
+    else:
+        for i, (epsg, chunk) in enumerate(chunks):
+            results[i] = _process_chunk(zones[epsg], xs[chunk], ys[chunk], threshold_m, search_radius_m)
+            done += len(chunk)
+            if progress_callback is not None:
+                progress_callback(done / total)
+    if not chunks and progress_callback is not None:
+        progress_callback(1.0)
+
+    # รวมผลตามลำดับ chunk (deterministic ไม่ขึ้นกับว่า worker ไหนเสร็จก่อน)
+    match_parts = []
+    for (epsg, chunk), (chunk_nearest_idx, chunk_nearest_dist, pt_idx, rl_idx, dist) in zip(chunks, results):
+        nearest_idx[chunk] = chunk_nearest_idx
+        nearest_dist[chunk] = chunk_nearest_dist
+        match_parts.append((chunk[pt_idx], rl_idx, dist))
+
+    if match_parts:
+        match_point = np.concatenate([m[0] for m in match_parts])
+        match_redline = np.concatenate([m[1] for m in match_parts])
+        match_dist = np.concatenate([m[2] for m in match_parts])
+        order = np.lexsort((match_redline, match_point))
+        match_point, match_redline, match_dist = expand_group_matches(
+            index, match_point[order], match_redline[order], match_dist[order]
+        )
+    else:
+        match_point = np.empty(0, dtype=np.int64)
+        match_redline = np.empty(0, dtype=np.int64)
+        match_dist = np.empty(0)
+
+    matched = np.zeros(total, dtype=bool)
+    matched[match_point] = True
+
+    return {
+        'nearest_idx': nearest_idx,
+        'nearest_dist': nearest_dist,
+        'matched': matched,
+        'match_point': match_point,
+        'match_redline': match_redline,
+        'match_dist': match_dist,
+    }
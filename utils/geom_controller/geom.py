@@ -3,6 +3,7 @@ import logging
 from collections import defaultdict
 from tqdm import tqdm
 
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 
@@ -56,4 +57,29 @@ def point_to_geom_distance_m(point_lon, point_lat, geom, epsg_cache_for_geom):
     utm_point = project_geom_with_transformer(Point(point_lon, point_lat), transformer)
     projected_geom = epsg_cache_for_geom[epsg]
     dist_m = projected_geom.distance(utm_point)
-    return dist_m, epsg
\ No newline at end of file
+    return dist_m, epsg
+
+# ---------- batch projection ----------
+def utm_epsg_for_lon_array(lons, lats):
+    """เหมือน utm_epsg_for_lon แต่รับ NumPy array และคืน array ของ EPSG code"""
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    zones = np.trunc((lons + 180) / 6).astype(np.int64) + 1
+    return np.where(lats >= 0, 32600 + zones, 32700 + zones)
+
+def project_points_to_utm(lons, lats):
+    """
+    Project จุดจำนวนมาก (lon,lat เป็น NumPy array) ไปยัง UTM zone ของแต่ละจุด
+    - จัดกลุ่มตาม EPSG แล้วเรียก Transformer.transform ครั้งเดียวต่อ zone
+    คืนค่า (xs, ys, epsgs) เป็น array ขนาดเท่ากับ input (เรียงตามลำดับเดิม)
+    """
+    lons = np.asarray(lons, dtype=np.float64)
+    lats = np.asarray(lats, dtype=np.float64)
+    epsgs = utm_epsg_for_lon_array(lons, lats)
+    xs = np.full(len(lons), np.nan)
+    ys = np.full(len(lons), np.nan)
+    for epsg in np.unique(epsgs):
+        mask = epsgs == epsg
+        transformer = get_transformer_to_utm(epsg)
+        xs[mask], ys[mask] = transformer.transform(lons[mask], lats[mask])
+    return xs, ys, epsgs
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+def build_match_matrix(match_point, match_redline, match_dist, n_points, max_radius_m):
+    """
+    เก็บคู่ (จุด, redline) ทั้งหมดที่อยู่ภายใน max_radius_m เป็น sparse matrix แบบ CSR
+    (match_* ต้องเรียงตามจุด แล้วตามลำดับ redline เหมือนผลของ compute_bulk_distances)
+    คืนค่า dict:
+      - 'indptr': คู่ของจุด i อยู่ที่ช่วง indptr[i]:indptr[i+1]
+      - 'redline' (int32), 'dist' (float64 - เก็บค่าเต็มเพื่อให้ผลตรงกับการคำนวณที่ threshold นั้นโดยตรง)
+      - 'point_min_dist': ระยะของ redline ที่ใกล้สุดภายใน max_radius_m ต่อจุด (inf ถ้าไม่มี)
+      - 'max_radius_m', 'n_points'
+    """
+    match_point = np.asarray(match_point, dtype=np.int64)
+    match_dist = np.asarray(match_dist, dtype=np.float64)
+    indptr = np.zeros(n_points + 1, dtype=np.int64)
+    np.cumsum(np.bincount(match_point, minlength=n_points), out=indptr[1:])
+
+    point_min_dist = np.full(n_points, np.inf)
+    np.minimum.at(point_min_dist, match_point, match_dist)
+
+    return {
+        'indptr': indptr,
+        'redline': np.asarray(match_redline, dtype=np.int32),
+        'dist': match_dist,
+        'point_min_dist': point_min_dist,
+        'max_radius_m': float(max_radius_m),
+        'n_points': n_points,
+    }
+
+
+def _check_threshold(matrix, threshold_m):
+    if threshold_m > matrix['max_radius_m']:
+        raise ValueError(
+            f"threshold {threshold_m} m เกินระยะค้นหาสูงสุดที่คำนวณไว้ ({matrix['max_radius_m']} m)"
+        )
+
+
+def matches_within(matrix, threshold_m):
+    """
+    คู่ (จุด, redline) ที่ระยะ <= threshold_m (ต้องไม่เกิน max_radius_m) - กรองอย่างเดียว ไม่คำนวณ geometry ใหม่
+    คืนค่า (match_point, match_redline, match_dist) เรียงตามจุด แล้วตามลำดับ redline
+    """
+    _check_threshold(matrix, threshold_m)
+    keep = matrix['dist'] <= threshold_m
+    match_point = np.repeat(np.arange(matrix['n_points'], dtype=np.int64), np.diff(matrix['indptr']))
+    return match_point[keep], matrix['redline'][keep].astype(np.int64), matrix['dist'][keep]
+
+
+def match_curve(matrix, thresholds):
+    """
+    จำนวน match ที่แต่ละ threshold (สำหรับกราฟ matches vs threshold)
+    คืนค่า (matched_points, total_matches): จำนวนจุดที่มี redline ภายใน threshold และจำนวนคู่ (จุด, redline)
+    """
+    thresholds = np.asarray(thresholds, dtype=np.float64)
+    _check_threshold(matrix, thresholds.max(initial=0.0))
+    matched_points = np.searchsorted(np.sort(matrix['point_min_dist']), thresholds, side='right')
+    total_matches = np.searchsorted(np.sort(matrix['dist']), thresholds, side='right')
+    return matched_points, total_matches
@@ -0,0 +1,322 @@
+import logging
+
+import numpy as np
+import shapely
+from shapely.geometry import Point
+from shapely.strtree import STRtree
+
+from .geom import get_transformer_to_utm, project_geom_with_transformer, utm_epsg_for_lon
+
+# รวมเส้นที่ geometry ซ้ำกันก่อนคำนวณระยะ (เมตร, Hausdorff distance)
+# 0 = รวมเฉพาะเส้นที่เป็นชุดจุดเดียวกันทุกประการ -> ผลเหมือนไม่รวมทุกอย่าง
+DEFAULT_DEDUPE_TOLERANCE_M = 0.0
+# ใช้กรองคู่ด้วย bounds (lon/lat) ก่อนคำนวณ Hausdorff: 1 องศาที่ละติจูด <= 35° ยาวอย่างน้อย ~90 km
+_MIN_METERS_PER_DEGREE = 90000.0
+# tolerance (เมตร) ของเส้นหยาบ (Douglas–Peucker) ที่ใช้กรองก่อนคำนวณระยะกับ segment ละเอียด (ดู simplify_segments)
+DEFAULT_SIMPLIFY_TOLERANCE_M = 10.0
+
+
+def build_redline_index(redline_geoms, epsgs=(), dedupe_tolerance_m=DEFAULT_DEDUPE_TOLERANCE_M,
+                        simplify_tolerance_m=DEFAULT_SIMPLIFY_TOLERANCE_M):
+    """
+    สร้าง index ของ redlines จาก list ที่ได้จากการโหลด (dict {'name','geom','epsg_cache'})
+    - แต่ละ redline จะถูกแตกเป็น segment ย่อย (เส้น 2 จุด) แล้วใส่ใน STRtree
+    - เส้นที่ geometry ซ้ำกัน (ดู group_duplicate_redlines) ใส่ tree ครั้งเดียว แล้วกระจายผลกลับให้ทุกชื่อ
+      (ดู expand_group_matches) - dedupe_tolerance_m=None = ไม่รวม
+    - แต่ละ zone มีเส้นหยาบ (Douglas–Peucker ที่ simplify_tolerance_m) ไว้ตัดคู่ที่ไกลเกิน threshold ก่อน
+      แล้วคำนวณระยะจริงกับ segment ละเอียดเฉพาะช่วงที่อาจใกล้ที่สุด (ผลเหมือนเดิมทุกค่า) - None = ไม่ใช้
+    - tree แยกตาม UTM zone (EPSG) และสร้างแบบ lazy เมื่อมีจุดใน zone นั้นครั้งแรก
+    - epsgs: zone ที่ต้องการสร้างทันที (ใช้เมื่อจะแชร์ index ข้าม thread แบบอ่านอย่างเดียว)
+    คืนค่า dict ที่ใช้กับ get_zone_index / query_redlines_near_point
+    """
+    if dedupe_tolerance_m is None:
+        group_of = np.arange(len(redline_geoms), dtype=np.int64)
+    else:
+        group_of = group_duplicate_redlines(redline_geoms, dedupe_tolerance_m)
+    # สมาชิกของแต่ละกลุ่มแบบ CSR: เส้นตัวแทน r มีสมาชิก group_members[group_indptr[r]:group_indptr[r + 1]]
+    group_members = np.argsort(group_of, kind='stable')
+    group_indptr = np.zeros(len(redline_geoms) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(group_of, minlength=len(redline_geoms)), out=group_indptr[1:])
+
+    index = {
+        'names': [rl['name'] for rl in redline_geoms],
+        'redlines': redline_geoms,
+        'group_of': group_of,
+        'group_members': group_members,
+        'group_indptr': group_indptr,
+        'dedupe_tolerance_m': dedupe_tolerance_m,
+        'simplify_tolerance_m': simplify_tolerance_m,
+        'zones': {},
+    }
+    n_groups = int(np.count_nonzero(group_of == np.arange(len(group_of))))
+    if n_groups < len(redline_geoms):
+        logging.info("รวม redline ที่ geometry ซ้ำกัน: %d เส้น -> %d กลุ่ม", len(redline_geoms), n_groups)
+    for epsg in epsgs:
+        get_zone_index(index, epsg)
+    return index
+
+
+def _projected_geom(rl, epsg):
+    projected_geom = rl['epsg_cache'].get(epsg)
+    if projected_geom is None:
+        projected_geom = project_geom_with_transformer(rl['geom'], get_transformer_to_utm(epsg))
+    return projected_geom
+
+
+def group_duplicate_redlines(redline_geoms, tolerance_m=DEFAULT_DEDUPE_TOLERANCE_M):
+    """
+    หาเส้นที่ geometry ซ้ำกัน -> array group_of: ลำดับเส้นตัวแทนของแต่ละเส้น (เส้นแรกของกลุ่มตามลำดับ redline_geoms)
+    - tolerance_m=0: รวมเฉพาะเส้นที่เป็นชุดจุดเดียวกัน (ไฟล์ copy, เส้นเดียวกันคนละทิศ) -> ระยะจากจุดใดๆ เท่ากันทุกเส้น
+    - tolerance_m>0: รวมเส้นที่ Hausdorff distance (บน UTM zone ของเส้นตัวแทน) ถึงเส้นตัวแทน <= tolerance_m
+      สมาชิกได้ระยะของเส้นตัวแทน (คลาดจากระยะจริงได้ถึงประมาณ tolerance_m)
+    """
+    n = len(redline_geoms)
+    group_of = np.arange(n, dtype=np.int64)
+    if n < 2:
+        return group_of
+    geoms = np.array([rl['geom'] for rl in redline_geoms], dtype=object)
+    bounds = shapely.bounds(geoms)
+    # ชุดจุดเดียวกัน -> bounds เท่ากันพอดี, Hausdorff <= tolerance -> bounds ต่างกันไม่เกิน tolerance
+    bounds_tol = tolerance_m / _MIN_METERS_PER_DEGREE
+
+    for i in range(n):
+        if group_of[i] != i:
+            continue
+        cand = np.flatnonzero(np.all(np.abs(bounds[i + 1:] - bounds[i]) <= bounds_tol, axis=1)) + i + 1
+        cand = cand[group_of[cand] == cand]
+        if len(cand) == 0:
+            continue
+        if tolerance_m == 0:
+            same = shapely.equals(geoms[cand], geoms[i])
+        else:
+            lon, lat = shapely.get_coordinates(shapely.centroid(geoms[i]))[0]
+            epsg = utm_epsg_for_lon(lon, lat)
+            rep = _projected_geom(redline_geoms[i], epsg)
+            others = np.array([_projected_geom(redline_geoms[j], epsg) for j in cand], dtype=object)
+            same = shapely.hausdorff_distance(others, rep) <= tolerance_m
+        group_of[cand[same]] = i
+    return group_of
+
+
+def expand_group_matches(index, match_point, match_redline, match_dist):
+    """
+    กระจายคู่ (จุด, เส้นตัวแทน, ระยะ) ให้ทุกเส้นในกลุ่ม (ดู group_duplicate_redlines)
+    คืนค่า (match_point, match_redline, match_dist) เรียงตามจุด แล้วตามลำดับ redline
+    """
+    group_indptr = index['group_indptr']
+    sizes = group_indptr[match_redline + 1] - group_indptr[match_redline]
+    if len(sizes) == 0 or sizes.max(initial=1) == 1:
+        return match_point, match_redline, match_dist
+    starts = np.repeat(group_indptr[match_redline], sizes)
+    offsets = np.arange(len(starts)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    match_point = np.repeat(match_point, sizes)
+    match_redline = index['group_members'][starts + offsets]
+    match_dist = np.repeat(match_dist, sizes)
+    order = np.lexsort((match_redline, match_point))
+    return match_point[order], match_redline[order], match_dist[order]
+
+
+def split_into_segments(geom):
+    """
+    แตก LineString / MultiLineString เป็น array ของ segment (LineString 2 จุด)
+    จุดยอดซ้ำติดกันในเส้นไม่ได้ segment ความยาว 0 (shapely.distance กับ segment แบบนี้เตือน invalid value)
+    """
+    coords, part_idx = shapely.get_coordinates(shapely.get_parts(geom), return_index=True)
+    if len(coords) < 2:
+        return np.empty(0, dtype=object)
+    # segment ต้องอยู่ใน part เดียวกัน (ไม่ต่อข้ามเส้น) และจุดต้นกับจุดปลายต้องไม่ใช่จุดเดียวกัน
+    keep = (part_idx[:-1] == part_idx[1:]) & np.any(coords[:-1] != coords[1:], axis=1)
+    starts = coords[:-1][keep]
+    ends = coords[1:][keep]
+    return shapely.linestrings(np.stack([starts, ends], axis=1))
+
+
+def _subsequence_indices(coords, kept):
+    """ลำดับของจุด kept ใน coords (kept เป็น subsequence ของ coords) หรือ None ถ้าหาไม่ครบ"""
+    coords_c = coords[:, 0] + 1j * coords[:, 1]
+    kept_c = kept[:, 0] + 1j * kept[:, 1]
+    indices = np.flatnonzero(np.isin(coords_c, kept_c))
+    if len(indices) != len(kept_c) or not np.array_equal(coords_c[indices], kept_c):
+        # มีจุดซ้ำในเส้น (เส้นวนกลับมาที่เดิม) -> เทียบทีละจุดตามลำดับ
+        matched = []
+        j = 0
+        for k, value in enumerate(coords_c.tolist()):
+            if j < len(kept_c) and value == kept_c[j]:
+                matched.append(k)
+                j += 1
+        if j != len(kept_c):
+            return None
+        indices = np.array(matched, dtype=np.int64)
+    if len(indices) < 2 or indices[0] != 0 or indices[-1] != len(coords) - 1:
+        return None
+    return indices
+
+
+def simplify_segments(segments, tolerance_m):
+    """
+    เส้นหยาบของ segment ของเส้นหนึ่ง (ผลจาก split_into_segments) ด้วย Douglas–Peucker ทีละช่วงที่ต่อเนื่องกัน
+    คืนค่า (coarse, start, stop): coarse[c] แทน segments[start[c]:stop[c]]
+    ทุกจุดยอดในช่วงห่างจาก coarse[c] ไม่เกิน tolerance_m (ตรวจซ้ำหลัง simplify - ช่วงไหนไม่ผ่านใช้ segment ละเอียดแทน)
+    -> ระยะจากจุดใดๆ ถึง coarse[c] ต่างจากระยะถึงช่วงละเอียดไม่เกิน tolerance_m
+    """
+    coords = shapely.get_coordinates(segments).reshape(-1, 2, 2)
+    if len(coords) == 0:
+        return np.empty(0, dtype=object), np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    breaks = np.flatnonzero(np.any(coords[1:, 0] != coords[:-1, 1], axis=1)) + 1
+    coarse_coords, starts, stops = [], [], []
+    for a, b in zip(np.r_[0, breaks].tolist(), np.r_[breaks, len(coords)].tolist()):
+        chain = np.vstack([coords[a:b, 0], coords[b - 1, 1]])
+        kept = shapely.get_coordinates(shapely.simplify(shapely.linestrings(chain), tolerance_m, preserve_topology=False))
+        kept_idx = _subsequence_indices(chain, kept)
+        if kept_idx is None:
+            kept_idx = np.arange(len(chain))
+        coarse_coords.append(np.stack([chain[kept_idx[:-1]], chain[kept_idx[1:]]], axis=1))
+        starts.append(a + kept_idx[:-1])
+        stops.append(a + kept_idx[1:])
+    coarse = shapely.linestrings(np.concatenate(coarse_coords))
+    start = np.concatenate(starts)
+    stop = np.concatenate(stops)
+
+    # ตรวจจุดยอดภายในของแต่ละช่วง (ปลายช่วงคือปลาย coarse segment อยู่แล้ว)
+    inner = stop - start - 1
+    owner = np.repeat(np.arange(len(coarse)), inner)
+    vertex = np.repeat(start + 1, inner) + (np.arange(inner.sum()) - np.repeat(np.cumsum(inner) - inner, inner))
+    too_far = shapely.distance(shapely.points(coords[vertex, 0]), coarse[owner]) > tolerance_m
+    bad = np.zeros(len(coarse), dtype=bool)
+    bad[owner[too_far]] = True
+    if bad.any():
+        count = np.where(bad, stop - start, 1)
+        c = np.repeat(np.arange(len(coarse)), count)
+        new_start = start[c] + (np.arange(count.sum()) - np.repeat(np.cumsum(count) - count, count))
+        coarse = np.where(bad[c], segments[new_start], coarse[c])
+        stop = np.where(bad[c], new_start + 1, stop[c])
+        start = new_start
+    return coarse, start, stop
+
+
+def _build_coarse_zone(index, epsg, redline_segments):
+    """เส้นหยาบของทั้ง zone: start/stop อ้างอิง index ใน zone['segments'] (redline_segments = [(rl_idx, segs)] ตามลำดับใน zone)"""
+    tolerance_m = index['simplify_tolerance_m']
+    coarse_parts, owners, starts, stops = [], [], [], []
+    offset = 0
+    for rl_idx, segs in redline_segments:
+        coarse_cache = index['redlines'][rl_idx].setdefault('coarse', {})
+        key = (epsg, tolerance_m)
+        if key not in coarse_cache:
+            coarse_cache[key] = simplify_segments(segs, tolerance_m)
+        coarse, start, stop = coarse_cache[key]
+        coarse_parts.append(coarse)
+        owners.append(np.full(len(coarse), rl_idx, dtype=np.int64))
+        starts.append(start + offset)
+        stops.append(stop + offset)
+        offset += len(segs)
+    coarse = np.concatenate(coarse_parts) if coarse_parts else np.empty(0, dtype=object)
+    return {
+        'tolerance_m': tolerance_m,
+        'segments': coarse,
+        'owner': np.concatenate(owners) if owners else np.empty(0, dtype=np.int64),
+        'start': np.concatenate(starts) if starts else np.empty(0, dtype=np.int64),
+        'stop': np.concatenate(stops) if stops else np.empty(0, dtype=np.int64),
+        'tree': STRtree(coarse),
+    }
+
+
+def get_zone_index(index, epsg):
+    """
+    คืน STRtree ของ redlines ทั้งหมดที่ project ไปยัง EPSG ที่กำหนด (สร้างครั้งเดียวต่อ zone)
+    - ใช้ epsg_cache ของแต่ละ redline ถ้ามี projected geometry อยู่แล้ว
+    zone dict: {'epsg', 'segments', 'owner', 'tree'} โดย owner[i] = ลำดับ redline (เส้นตัวแทนของกลุ่ม) ของ segment i
+      และ 'coarse' (ดู _build_coarse_zone) ถ้า index มี simplify_tolerance_m
+    """
+    zone = index['zones'].get(epsg)
+    if zone is not None:
+        return zone
+
+    transformer = get_transformer_to_utm(epsg)
+    segments = []
+    owners = []
+    redline_segments = []
+    group_of = index['group_of']
+    for rl_idx, rl in enumerate(index['redlines']):
+        if group_of[rl_idx] != rl_idx:
+            # เส้นซ้ำ -> ใช้ segment ของเส้นตัวแทน (ผลกระจายกลับด้วย expand_group_matches)
+            continue
+        # segment ของแต่ละเส้นเก็บไว้ใน dict ของเส้นนั้น -> สร้าง index ใหม่จากเส้นเดิม (เช่น reload catalog) ไม่ต้องแตกใหม่
+        segment_cache = rl.setdefault('segments', {})
+        segs = segment_cache.get(epsg)
+        if segs is None:
+            projected_geom = rl['epsg_cache'].get(epsg)
+            if projected_geom is None:
+                try:
+                    projected_geom = project_geom_with_transformer(rl['geom'], transformer)
+                except Exception as e:
+                    logging.error("การแปลง geometry ของ %s ไป EPSG:%d ผิดพลาด: %s", rl['name'], epsg, e)
+                    continue
+                rl['epsg_cache'][epsg] = projected_geom
+            segs = segment_cache[epsg] = split_into_segments(projected_geom)
+        segments.append(segs)
+        owners.append(np.full(len(segs), rl_idx, dtype=np.int64))
+        redline_segments.append((rl_idx, segs))
+
+    segments = np.concatenate(segments) if segments else np.empty(0, dtype=object)
+    owner = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+    zone = {
+        'epsg': epsg,
+        'segments': segments,
+        'owner': owner,
+        'tree': STRtree(segments),
+    }
+    if index.get('simplify_tolerance_m') is not None:
+        zone['coarse'] = _build_coarse_zone(index, epsg, redline_segments)
+    index['zones'][epsg] = zone
+    logging.info("สร้าง redline index EPSG:%d -> %d segments", epsg, len(segments))
+    return zone
+
+
+def query_redlines_near_point(index, epsg, x, y, threshold_m, search_radius_m=None):
+    """
+    หา redline ที่ใกล้ที่สุด และ redline ทั้งหมดที่อยู่ภายใน threshold_m จากจุดที่ project แล้ว
+    (x, y เป็นเมตรใน EPSG ของจุด ดู project_points_to_utm)
+    search_radius_m: หา nearest เฉพาะภายในระยะนี้ (None = ไม่จำกัด)
+    คืนค่า (nearest_idx, nearest_dist, matches)
+      - nearest_idx: ลำดับ redline ที่ใกล้ที่สุด (None ถ้าไม่มี หรือไม่มีภายใน search_radius_m)
+      - matches: list ของ (redline_idx, distance_m) เรียงตามลำดับ redline
+    ถ้าระยะเท่ากันจะเลือก redline ที่อยู่ก่อนในรายการ (เหมือน loop เดิม)
+    """
+    if search_radius_m is not None and search_radius_m < threshold_m:
+        raise ValueError(f"search_radius_m ({search_radius_m}) ต้องไม่น้อยกว่า threshold_m ({threshold_m})")
+    zone = get_zone_index(index, int(epsg))
+    if len(zone['segments']) == 0:
+        return None, float('inf'), []
+
+    utm_point = Point(x, y)
+
+    # nearest: query_nearest คืนทุก segment ที่ระยะเท่ากัน -> เลือก redline ลำดับแรก
+    seg_idx, seg_dist = zone['tree'].query_nearest(
+        utm_point, max_distance=search_radius_m, return_distance=True, all_matches=True
+    )
+    if len(seg_idx) == 0:
+        return None, float('inf'), []
+    nearest_idx = int(zone['owner'][seg_idx].min())
+    nearest_dist = float(seg_dist[0])
+
+    # ภายใน threshold: กรองด้วย envelope ก่อนแล้วคำนวณระยะจริง
+    window = shapely.box(x - threshold_m, y - threshold_m, x + threshold_m, y + threshold_m)
+    cand = zone['tree'].query(window)
+    matches = []
+    if len(cand):
+        dists = shapely.distance(zone['segments'][cand], utm_point)
+        owners = zone['owner'][cand]
+        best = {}
+        for rl_idx, dist in zip(owners.tolist(), dists.tolist()):
+            if dist <= threshold_m and dist < best.get(rl_idx, float('inf')):
+                best[rl_idx] = dist
+        group_indptr = index['group_indptr']
+        group_members = index['group_members']
+        matches = sorted(
+            (int(member), dist)
+            for rl_idx, dist in best.items()
+            for member in group_members[group_indptr[rl_idx]:group_indptr[rl_idx + 1]]
+        )
+
+    return nearest_idx, nearest_dist, matches
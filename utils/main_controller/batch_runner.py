@@ -0,0 +1,207 @@
+import os
+import glob
+import json
+import time
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ..parse_controller.point_table import read_point_table
+from ..cache_controller.geom_cache import load_redline_geoms, DEFAULT_GEOM_CACHE_DIR, PRECOMPUTED_EPSGS
+from ..cache_controller.redline_catalog import scan_redline_files, DEFAULT_REDLINE_DIRS
+from ..geom_controller.redline_index import build_redline_index
+from ..excel_controller.write_results_to_excel import write_results_to_excel
+from ..excel_controller.write_results_columnar import write_results_columnar
+from .main_analysis import compute_threshold_sweep, summarize_at_threshold, matches_table_at_threshold
+
+# ชุด redlines มาตรฐาน = โฟลเดอร์เดียวกับ redline catalog (ชื่อชุด = ชื่อโฟลเดอร์ เช่น U1, U2, แยกแล้ว)
+DEFAULT_REDLINE_SETS = {os.path.basename(redline_dir): redline_dir for redline_dir in DEFAULT_REDLINE_DIRS}
+DEFAULT_THRESHOLDS = [111]
+# รูปแบบผลลัพธ์: xlsx (write_results_to_excel) และ/หรือ parquet / csv / gpkg (write_results_columnar)
+DEFAULT_OUTPUT_FORMATS = ["xlsx"]
+DEFAULT_BATCH_WORKERS = os.cpu_count() or 1
+SUMMARY_FILE = "summary.json"
+
+
+def resolve_redline_files(spec):
+    """
+    ไฟล์ redlines ของชุดหนึ่ง: list ของ path, โฟลเดอร์ หรือ glob pattern
+    โฟลเดอร์สแกนแบบเดียวกับ redline catalog (ทุก .kml / .kmz ดู scan_redline_files) -> ได้ไฟล์ชุดเดียวกับใน app
+    """
+    if isinstance(spec, (list, tuple)):
+        return list(spec)
+    if os.path.isdir(spec):
+        return scan_redline_files([spec])
+    return sorted(glob.glob(spec))
+
+
+def load_job_spec(path):
+    """
+    อ่าน job spec (JSON) แล้วเติมค่า default
+      - output_dir: โฟลเดอร์ผลลัพธ์
+      - point_groups: dict ชื่อชุด -> dict group_name -> ไฟล์ points (default: {"all": config.points_files})
+      - redline_sets: dict ชื่อชุด -> list / โฟลเดอร์ / glob ของไฟล์ redlines (default: DEFAULT_REDLINE_SETS)
+      - thresholds: list ของระยะ (เมตร)
+      - formats: list จาก "xlsx", "parquet", "csv", "gpkg"
+      - partition_by: สำหรับ parquet / csv ("redline", "group" หรือ null)
+      - workers: จำนวนงานที่รันพร้อมกัน
+      - search_radius_m: ระยะค้นหา nearest สูงสุด (>= threshold สูงสุด, null = ไม่จำกัด ดู analyze_points_vs_redlines)
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        spec = json.load(f)
+    if "point_groups" not in spec:
+        from config import points_files
+        spec["point_groups"] = {"all": points_files}
+    spec.setdefault("output_dir", "batch_output")
+    spec.setdefault("redline_sets", DEFAULT_REDLINE_SETS)
+    spec.setdefault("thresholds", DEFAULT_THRESHOLDS)
+    spec.setdefault("formats", DEFAULT_OUTPUT_FORMATS)
+    spec.setdefault("partition_by", "redline")
+    spec.setdefault("workers", DEFAULT_BATCH_WORKERS)
+    spec.setdefault("search_radius_m", None)
+    return spec
+
+
+def load_redline_set_indexes(redline_sets, geom_cache_dir=DEFAULT_GEOM_CACHE_DIR):
+    """
+    โหลด redlines ของทุกชุดครั้งเดียว (ไฟล์ที่อยู่หลายชุดอ่านครั้งเดียว) แล้วสร้าง index แยกต่อชุด
+    คืนค่า dict ชื่อชุด -> redline index (None ถ้าชุดนั้นไม่มีเส้นที่ใช้งานได้)
+    """
+    set_files = {name: resolve_redline_files(files) for name, files in redline_sets.items()}
+    all_files = list(dict.fromkeys(f for files in set_files.values() for f in files))
+    by_path = {rl['path']: rl for rl in load_redline_geoms(all_files, cache_dir=geom_cache_dir)}
+
+    indexes = {}
+    for name, files in set_files.items():
+        redline_geoms = [by_path[f] for f in files if f in by_path]
+        if not redline_geoms:
+            logging.error("ชุด redlines %s ไม่มีเส้นที่ใช้งานได้ (%d ไฟล์)", name, len(files))
+            indexes[name] = None
+            continue
+        # สร้าง tree ของ UTM 47/48 ไว้ก่อน -> แชร์ข้าม thread แบบอ่านอย่างเดียว
+        indexes[name] = build_redline_index(redline_geoms, epsgs=PRECOMPUTED_EPSGS)
+        logging.info("ชุด redlines %s: %d เส้น", name, len(redline_geoms))
+    return indexes
+
+
+def _output_stem(point_group, redline_set, threshold_m):
+    stem = f"{point_group}__{redline_set}__{threshold_m:g}m"
+    return stem.replace('/', '_').replace('\\', '_').replace(':', '_')
+
+
+def _write_threshold_outputs(spec, sweep, point_group, redline_set, threshold_m):
+    """สรุปผลที่ threshold หนึ่งจาก sweep แล้วเขียนทุกรูปแบบ -> dict ของผล + เวลาแต่ละขั้น"""
+    t0 = time.perf_counter()
+    points_df, redline_summary = summarize_at_threshold(sweep, threshold_m)
+    summarize_s = time.perf_counter() - t0
+
+    stem = os.path.join(spec["output_dir"], _output_stem(point_group, redline_set, threshold_m))
+    outputs = []
+    t0 = time.perf_counter()
+    if "xlsx" in spec["formats"]:
+        outputs.append(write_results_to_excel(points_df, redline_summary, threshold_m, stem + ".xlsx"))
+    columnar_formats = [fmt for fmt in spec["formats"] if fmt != "xlsx"]
+    if columnar_formats:
+        outputs.extend(write_results_columnar(
+            points_df, matches_table_at_threshold(sweep, threshold_m), stem,
+            formats=columnar_formats, partition_by=spec["partition_by"]
+        ))
+    write_s = time.perf_counter() - t0
+
+    return {
+        "point_group": point_group,
+        "redline_set": redline_set,
+        "threshold_m": threshold_m,
+        "points": len(points_df),
+        "matched_points": int(points_df["matched"].sum()),
+        "total_matches": sum(info["total_matches"] for info in redline_summary.values()),
+        "summarize_s": round(summarize_s, 3),
+        "write_s": round(write_s, 3),
+        "outputs": outputs,
+    }
+
+
+def run_batch(spec, geom_cache_dir=DEFAULT_GEOM_CACHE_DIR):
+    """
+    รันทุกชุด (point group × redline set × threshold) ตาม job spec (ดู load_job_spec)
+      1) โหลด redlines ของทุกชุดครั้งเดียว, อ่านไฟล์ points ของแต่ละ group ครั้งเดียว
+      2) คำนวณระยะครั้งเดียวต่อ (point group, redline set) ถึง threshold สูงสุด (compute_threshold_sweep)
+      3) ทุก threshold ได้จากการกรองผลข้อ 2 แล้วเขียนไฟล์ลง output_dir
+    งานข้อ 2-3 รันพร้อมกันใน thread pool (shapely / pyproj / การเขียนไฟล์ปล่อย GIL ส่วนใหญ่)
+    เขียนสรุปเวลาแต่ละขั้นเป็น JSON ที่ <output_dir>/summary.json และคืนค่า dict เดียวกัน
+    """
+    started = time.perf_counter()
+    os.makedirs(spec["output_dir"], exist_ok=True)
+    thresholds = sorted(set(spec["thresholds"]))
+    max_radius_m = max(thresholds)
+    summary = {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "spec": {
+            "point_groups": list(spec["point_groups"]),
+            **{key: spec[key] for key in ("redline_sets", "thresholds", "formats", "partition_by", "workers", "search_radius_m")},
+        },
+        "runs": [],
+        "errors": [],
+    }
+
+    t0 = time.perf_counter()
+    indexes = load_redline_set_indexes(spec["redline_sets"], geom_cache_dir=geom_cache_dir)
+    summary["load_redlines_s"] = round(time.perf_counter() - t0, 3)
+
+    with ThreadPoolExecutor(max_workers=spec["workers"]) as pool:
+        t0 = time.perf_counter()
+        tables = dict(zip(
+            spec["point_groups"],
+            pool.map(read_point_table, spec["point_groups"].values()),
+        ))
+        summary["read_points_s"] = round(time.perf_counter() - t0, 3)
+
+        def sweep_task(point_group, redline_set):
+            t = time.perf_counter()
+            sweep = compute_threshold_sweep(
+                spec["point_groups"][point_group], None, max_radius_m=max_radius_m,
+                redline_index=indexes[redline_set], points_table=tables[point_group],
+                search_radius_m=spec["search_radius_m"]
+            )
+            return sweep, round(time.perf_counter() - t, 3)
+
+        sweep_futures = {
+            pool.submit(sweep_task, point_group, redline_set): (point_group, redline_set)
+            for point_group in spec["point_groups"]
+            for redline_set, index in indexes.items() if index is not None
+        }
+        output_futures = {}
+        for future in as_completed(sweep_futures):
+            point_group, redline_set = sweep_futures[future]
+            try:
+                sweep, sweep_s = future.result()
+            except Exception as e:
+                logging.exception("คำนวณ %s × %s ไม่สำเร็จ", point_group, redline_set)
+                summary["errors"].append({"point_group": point_group, "redline_set": redline_set, "error": str(e)})
+                continue
+            if sweep is None:
+                summary["errors"].append({"point_group": point_group, "redline_set": redline_set, "error": "ไม่มีข้อมูล"})
+                continue
+            for threshold_m in thresholds:
+                f = pool.submit(_write_threshold_outputs, spec, sweep, point_group, redline_set, threshold_m)
+                output_futures[f] = (point_group, redline_set, threshold_m, sweep_s)
+
+        for future in as_completed(output_futures):
+            point_group, redline_set, threshold_m, sweep_s = output_futures[future]
+            try:
+                run = future.result()
+            except Exception as e:
+                logging.exception("เขียนผล %s × %s @ %s m ไม่สำเร็จ", point_group, redline_set, threshold_m)
+                summary["errors"].append({
+                    "point_group": point_group, "redline_set": redline_set, "threshold_m": threshold_m, "error": str(e)
+                })
+                continue
+            run["sweep_s"] = sweep_s
+            summary["runs"].append(run)
+            logging.info("เสร็จ %s × %s @ %s m -> %s", point_group, redline_set, threshold_m, ", ".join(run["outputs"]))
+
+    summary["runs"].sort(key=lambda r: (r["point_group"], r["redline_set"], r["threshold_m"]))
+    summary["total_s"] = round(time.perf_counter() - started, 3)
+    with open(os.path.join(spec["output_dir"], SUMMARY_FILE), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
@@ -0,0 +1,97 @@
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+from openpyxl import Workbook
+
+from ..parse_controller.parse_points import parse_kml_points
+from ..excel_controller.write_results_to_excel import append_dataframe_sheet
+from ..excel_controller.write_results_columnar import write_table_dataset
+
+# รูปแบบผลลัพธ์ของการแปลงไฟล์ points
+CONVERT_FORMATS = ("xlsx", "parquet")
+
+
+def _read_points_frame(source):
+    """(ทำงานใน worker) อ่านจุดจากไฟล์เดียว -> (DataFrame, ข้อความ error หรือ None)"""
+    try:
+        return pd.DataFrame(parse_kml_points(source)), None
+    except Exception as e:
+        return pd.DataFrame(), f"{type(e).__name__}: {e}"
+
+
+def read_points_frames(points_files, max_workers=None):
+    """
+    อ่านไฟล์ points ทุกกลุ่มพร้อมกันด้วย process pool -> dict group_name -> DataFrame (ตามลำดับ points_files)
+    ไฟล์ที่อ่านไม่ได้จะได้ DataFrame ว่าง (log warning แล้วข้าม ไม่ทำให้ไฟล์อื่นล้ม)
+    max_workers: จำนวน process (None = จำนวน CPU, 1 = ทำใน process เดิม)
+    """
+    groups = list(points_files)
+    sources = [points_files[g] for g in groups]
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(sources)))
+
+    if max_workers == 1:
+        results = [_read_points_frame(s) for s in sources]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_read_points_frame, sources))
+
+    frames = {}
+    for group, source, (df, error) in zip(groups, sources, results):
+        if error is not None:
+            logging.warning("อ่านไฟล์ points %s ไม่สำเร็จ: %s - ข้าม", source, error)
+        frames[group] = df
+    return frames
+
+
+def _group_sheet_names(groups):
+    """ชื่อ sheet ต่อกลุ่ม (จำกัด 31 chars, ไม่ใช้อักขระพิเศษ, ชื่อซ้ำต่อท้ายด้วย _1, _2, ...)"""
+    sheet_names = {}
+    used = set()
+    for group in groups:
+        safe_name = group.replace('/', '_').replace('\\', '_').replace(':', '_')[:31]
+        sheet_name = safe_name
+        suffix = 1
+        while sheet_name in used:
+            sheet_name = f"{safe_name[:25]}_{suffix}"
+            suffix += 1
+        used.add(sheet_name)
+        sheet_names[group] = sheet_name
+    return sheet_names
+
+
+def convert_points_files(points_files, output_path, output_format="xlsx", max_workers=None):
+    """
+    แปลงไฟล์ points ทุกกลุ่ม (เช่น config.points_files) เป็นไฟล์เดียวในคำสั่งเดียว
+      - xlsx: workbook เดียว 1 sheet ต่อกลุ่ม (คอลัมน์เหมือน save_points_to_excel)
+      - parquet: dataset เดียว มีคอลัมน์ group และแยกโฟลเดอร์ตามกลุ่ม (group_id=<code>)
+    points_files: dict group_name -> filepath (kml/kmz)
+    คืนค่า path ของผลลัพธ์
+    """
+    if output_format not in CONVERT_FORMATS:
+        raise ValueError(f"ไม่รองรับรูปแบบไฟล์: {output_format} (ใช้ได้: {CONVERT_FORMATS})")
+
+    frames = read_points_frames(points_files, max_workers=max_workers)
+    output_dir = os.path.dirname(output_path)
+    if output_dir:
+        os.makedirs(output_dir, exist_ok=True)
+
+    if output_format == "xlsx":
+        wb = Workbook(write_only=True)
+        for group, sheet_name in _group_sheet_names(frames).items():
+            append_dataframe_sheet(wb, sheet_name, frames[group])
+        wb.save(output_path)
+    else:
+        non_empty = [df.assign(group=group) for group, df in frames.items() if len(df)]
+        all_points = pd.concat(non_empty, ignore_index=True) if non_empty else pd.DataFrame({'group': []})
+        all_points['group'] = pd.Categorical(all_points['group'], categories=list(frames))
+        all_points = all_points[['group'] + [col for col in all_points.columns if col != 'group']]
+        write_table_dataset(all_points, output_path, "parquet", partition_by="group")
+
+    for group, df in frames.items():
+        logging.info("แปลง %s -> %d จุด", group, len(df))
+    logging.info("✅ บันทึกข้อมูล points ทั้งหมดแล้ว: %s", output_path)
+    return output_path
@@ -0,0 +1,125 @@
+import time
+import uuid
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# จำนวนงานที่รันพร้อมกันได้ (งานที่เกินจะรอคิว)
+DEFAULT_MAX_CONCURRENT_JOBS = 2
+# เก็บงานที่จบแล้วไว้กี่งาน (ให้ refresh หน้าแล้วยังดาวน์โหลดผลได้) - เกินแล้วลบงานเก่าสุดออก
+DEFAULT_MAX_FINISHED_JOBS = 50
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+
+
+def create_job_queue(max_workers=DEFAULT_MAX_CONCURRENT_JOBS, max_finished=DEFAULT_MAX_FINISHED_JOBS):
+    """
+    สร้างคิวงาน background (thread pool ขนาดจำกัด) -> dict ที่ใช้กับ submit_job / get_job_status
+    งานหนักภายใน (shapely / pyproj / process pool ของ bulk distance) ปล่อย GIL อยู่แล้ว จึงใช้ thread ได้
+    """
+    return {
+        'executor': ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="analysis-job"),
+        'max_workers': max_workers,
+        'max_finished': max_finished,
+        'jobs': {},
+        'lock': threading.Lock(),
+    }
+
+
+def _prune_finished_jobs(queue):
+    """ลบงานที่จบแล้วเก่าสุดออกจนเหลือไม่เกิน max_finished (เรียกขณะถือ lock)"""
+    finished = [job for job in queue['jobs'].values() if job['state'] in (JOB_DONE, JOB_FAILED)]
+    finished.sort(key=lambda job: job['finished_at'])
+    for job in finished[:max(len(finished) - queue['max_finished'], 0)]:
+        del queue['jobs'][job['id']]
+
+
+def _run_job(queue, job, fn, args, kwargs):
+    lock = queue['lock']
+
+    def report(fraction, text=None):
+        with lock:
+            job['progress'] = fraction
+            if text is not None:
+                job['text'] = text
+
+    with lock:
+        job['state'] = JOB_RUNNING
+        job['started_at'] = time.time()
+    try:
+        result = fn(*args, progress_callback=report, **kwargs)
+    except Exception as e:
+        logging.exception("งาน %s ล้มเหลว", job['id'])
+        with lock:
+            job.update(state=JOB_FAILED, error=str(e), finished_at=time.time())
+            _prune_finished_jobs(queue)
+        return
+    with lock:
+        job.update(state=JOB_DONE, progress=1.0, result=result, finished_at=time.time())
+        _prune_finished_jobs(queue)
+
+
+def _new_job():
+    return {
+        'id': uuid.uuid4().hex[:12],
+        'state': JOB_QUEUED,
+        'progress': 0.0,
+        'text': None,
+        'result': None,
+        'error': None,
+        'submitted_at': time.time(),
+        'started_at': None,
+        'finished_at': None,
+    }
+
+
+def submit_job(queue, fn, *args, **kwargs):
+    """
+    ส่งงานเข้าคิว -> คืน job_id
+    fn จะถูกเรียกเป็น fn(*args, progress_callback=..., **kwargs) ใน worker thread
+    ค่าที่ fn คืนจะเก็บไว้ใน status['result'] เมื่องานเสร็จ
+    """
+    job = _new_job()
+    job_id = job['id']
+    with queue['lock']:
+        queue['jobs'][job_id] = job
+    queue['executor'].submit(_run_job, queue, job, fn, args, kwargs)
+    logging.info("ส่งงาน %s เข้าคิว", job_id)
+    return job_id
+
+
+def add_finished_job(queue, result):
+    """
+    เพิ่มงานที่เสร็จแล้ว (เช่นผลจาก cache) เข้าคิวโดยไม่ต้องรัน -> คืน job_id
+    ใช้ผ่าน get_job_status ได้เหมือนงานปกติ (refresh หน้าแล้วยังดูผลต่อได้)
+    """
+    job = _new_job()
+    now = time.time()
+    job.update(state=JOB_DONE, progress=1.0, result=result, started_at=now, finished_at=now)
+    with queue['lock']:
+        queue['jobs'][job['id']] = job
+        _prune_finished_jobs(queue)
+    return job['id']
+
+
+def get_job_status(queue, job_id):
+    """
+    สถานะปัจจุบันของงาน (สำเนา dict) หรือ None ถ้าไม่รู้จัก job_id
+    key: id, state, progress, text, result, error, submitted_at, started_at, finished_at
+         และ queue_position (จำนวนงานที่รออยู่ก่อนหน้า, 0 ถ้าไม่ได้รอคิว)
+    """
+    with queue['lock']:
+        job = queue['jobs'].get(job_id)
+        if job is None:
+            return None
+        status = dict(job)
+        status['queue_position'] = 0
+        if job['state'] == JOB_QUEUED:
+            status['queue_position'] = sum(
+                1 for other in queue['jobs'].values()
+                if other['state'] == JOB_QUEUED and other['submitted_at'] < job['submitted_at']
+            )
+    return status
@@ -1,6 +1,7 @@
 import os
 import logging
 from collections import defaultdict
+import numpy as np
 import pandas as pd
 import xml.etree.ElementTree as ET
 from shapely.geometry import LineString, Point
@@ -8,141 +9,181 @@ from shapely.ops import unary_union, transform
 from pyproj import CRS, Transformer
 from datetime import datetime
 
-from ..parse_controller.parse_points import parse_kml_points
-from ..parse_controller.parse_lines import parse_kml_lines
-from ..geom_controller.geom import point_to_geom_distance_m
-
-import streamlit as st  # สำหรับ progress bar
-
-def analyze_points_vs_redlines(points_grouped, redlines_files, threshold_m=100):
+from ..parse_controller.point_table import read_point_table, POINT_COLUMNS
+from ..cache_controller.geom_cache import load_redline_geoms, DEFAULT_GEOM_CACHE_DIR
+from ..geom_controller.geom import project_points_to_utm
+from ..geom_controller.redline_index import build_redline_index
+from ..geom_controller.bulk_distance import compute_bulk_distances
+from ..geom_controller.match_matrix import build_match_matrix, matches_within
+from .progress import throttle_progress
+
+def analyze_points_vs_redlines(points_grouped, redlines_files, threshold_m=100, geom_cache_dir=DEFAULT_GEOM_CACHE_DIR,
+                               parse_workers=None, analysis_workers=1, progress_callback=None,
+                               redline_index=None, search_radius_m=None):
     """
-    points_grouped: dict mapping group_name -> filepath (kml)
+    points_grouped: dict mapping group_name -> filepath (kml/kmz) หรือ bytes / file-like
     redlines_files: dict mapping redline_name -> filepath (kml)
     threshold_m: ระยะ threshold ในเมตร
+    geom_cache_dir: โฟลเดอร์ cache ของ geometry redline (None = parse ใหม่ทุกครั้ง)
+    parse_workers: จำนวน process ที่ใช้ parse redlines ที่ไม่มีใน cache (None = จำนวน CPU)
+    analysis_workers: จำนวน process ที่ใช้คำนวณระยะ (แบ่งจุดเป็น chunk, 1 = process เดิม)
+    progress_callback: ฟังก์ชัน callback(fraction, text) สำหรับแสดงความคืบหน้า (เช่น st.progress ของ UI)
+        จะถูกเรียกแบบจำกัดความถี่ (ดู throttle_progress), None = ไม่รายงาน
+    redline_index: index ที่สร้างไว้แล้วจาก build_redline_index (เช่น shared ทั้ง server)
+        ถ้าส่งมาจะไม่โหลด redlines_files ใหม่
+    search_radius_m: ระยะค้นหา redline ที่ใกล้ที่สุดสูงสุด (>= threshold_m) - จุดที่ไม่มีเส้นภายในระยะนี้
+        ได้ nearest_redline = None / distance_m = inf ("ไม่มีภายในระยะ") แทนเส้นที่ไกลหลายร้อยกิโลเมตร
+        และไม่ต้องคำนวณระยะจริงไปยังเส้นไกลๆ เลย; None = หา nearest เสมอ (แบบเดิม)
     Returns:
       - points_df: pandas.DataFrame with nearest redline and distance
       - redline_summary: dict mapping redline_name -> list of matched point dicts
     """
-    # 1) Load points
-    all_points = []
+    report = throttle_progress(progress_callback)
+    sweep = compute_threshold_sweep(
+        points_grouped, redlines_files, max_radius_m=threshold_m, geom_cache_dir=geom_cache_dir,
+        parse_workers=parse_workers, analysis_workers=analysis_workers, progress_callback=progress_callback,
+        redline_index=redline_index, search_radius_m=search_radius_m
+    )
+    if sweep is None:
+        return None, None
+
+    report(0.9, "สรุปผล")
+    points_df, redline_summary_counts = summarize_at_threshold(sweep, threshold_m)
+    report(1.0, "เสร็จแล้ว")
+    return points_df, redline_summary_counts
+
+
+def compute_threshold_sweep(points_grouped, redlines_files, max_radius_m, geom_cache_dir=DEFAULT_GEOM_CACHE_DIR,
+                            parse_workers=None, analysis_workers=1, progress_callback=None,
+                            redline_index=None, points_table=None, search_radius_m=None):
+    """
+    อ่านจุด + คำนวณระยะครั้งเดียว เก็บทุก redline ที่อยู่ภายใน max_radius_m ของแต่ละจุด (ดู build_match_matrix)
+    แล้วใช้ summarize_at_threshold สรุปผลที่ threshold ใดก็ได้ที่ <= max_radius_m ทันที ไม่ต้องคำนวณ geometry ใหม่
+    พารามิเตอร์อื่นเหมือน analyze_points_vs_redlines (progress รายงานถึง 0.9)
+    points_table: ตารางจุดที่อ่านไว้แล้ว (read_point_table) - ถ้าส่งมาจะไม่อ่าน points_grouped ซ้ำ
+    คืนค่า dict ของผลคำนวณ หรือ None ถ้าไม่มีจุด / redline
+    """
+    report = throttle_progress(progress_callback)
+
+    # 1) Load points -> ตาราง columnar (lat/lon float64, ฟิลด์ข้อความเป็น category)
     logging.info("เริ่มอ่านไฟล์ points...")
-    for group_name, filepath in points_grouped.items():
-        pts = parse_kml_points(filepath)
-        if not pts:
-            logging.info("ไฟล์ %s - ไม่มีจุดหรือไม่พบ", filepath)
-            continue
-        for p in pts:
-            p['group'] = group_name
-            all_points.append(p)
-        logging.info("อ่าน %s -> %d จุด", group_name, len(pts))
-
-    if not all_points:
+    report(0.0, "อ่านไฟล์ points")
+    if points_table is None:
+        points_table = read_point_table(points_grouped)
+
+    if len(points_table) == 0:
         logging.error("ไม่พบ points ใด ๆ")
-        return None, None
+        return None
+
+    # พิกัดปัดเศษ 6 ตำแหน่งต่อจุด (ใช้ทั้งตรวจ duplicate และนับ unique ใน summary)
+    coord_keys = list(zip(
+        [round(v, 6) for v in points_table['lat'].tolist()],
+        [round(v, 6) for v in points_table['lon'].tolist()],
+    ))
+    point_columns = {col: points_table[col].tolist() for col in POINT_COLUMNS}
 
     # ตรวจสอบ duplicate coordinates
-    coord_groups = defaultdict(list)
-    for p in all_points:
-        coord_key = (round(float(p['lat']), 6), round(float(p['lon']), 6))
-        coord_groups[coord_key].append(p)
+    coord_details = defaultdict(set)
+    for idx, coord_key in enumerate(coord_keys):
+        coord_details[coord_key].add((
+            point_columns['ticket'][idx],
+            point_columns['sign'][idx],
+            point_columns['site'][idx],
+            point_columns['group'][idx]
+        ))
 
     duplicate_coords = 0
-    for coord, points in coord_groups.items():
-        if len(points) > 1:
-            unique_details = set()
-            for p in points:
-                detail_key = (
-                    p.get('ticket'),
-                    p.get('sign'),
-                    p.get('site'),
-                    p.get('group')
-                )
-                unique_details.add(detail_key)
-            if len(unique_details) > 1:
-                duplicate_coords += 1
-                logging.warning("พบจุด coordinate ซ้ำ (%s) แต่รายละเอียดต่าง", coord)
+    for coord, unique_details in coord_details.items():
+        if len(unique_details) > 1:
+            duplicate_coords += 1
+            logging.warning("พบจุด coordinate ซ้ำ (%s) แต่รายละเอียดต่าง", coord)
 
     if duplicate_coords > 0:
         logging.warning("พบ coordinate ที่ซ้ำกันทั้งหมด %d ตำแหน่ง", duplicate_coords)
 
-    # 2) Load redlines
-    redline_geoms = []
-    # ก่อนหน้านี้
-    # for rl_name, fname in redlines_files.items():
-    # เปลี่ยนเป็น
-    for fname in redlines_files:
-        geom = parse_kml_lines(fname)
-        if geom is None:
-            logging.warning("redline %s ไม่มี geometry - ข้าม", fname)
-            continue
-        redline_geoms.append({'name': os.path.basename(fname), 'geom': geom, 'epsg_cache': {}})
-        logging.info("โหลด redline: %s", fname)
-
-
+    # 2) Load redlines (ใช้ geometry cache บน disk ถ้ามี) - ข้ามได้ถ้าส่ง index ที่สร้างไว้แล้วมา
+    if redline_index is None:
+        report(0.1, "โหลด redlines")
+        redline_geoms = load_redline_geoms(redlines_files, cache_dir=geom_cache_dir, max_workers=parse_workers)
+        if not redline_geoms:
+            logging.error("ไม่พบ redlines ที่ใช้งานได้")
+            return None
+
+        # สร้าง spatial index ของ segment ทั้งหมด (ครั้งเดียว) แทนการวน points × redlines
+        redline_index = build_redline_index(redline_geoms)
+    redline_geoms = redline_index['redlines']
     if not redline_geoms:
         logging.error("ไม่พบ redlines ที่ใช้งานได้")
-        return None, None
-
-    # 3) Progress bar
-    progress_bar = st.progress(0)
-    total_points = len(all_points)
-    points_results = []
-    redline_matches = defaultdict(list)
+        return None
+
+    # project จุดทั้งหมดครั้งเดียว (batch ต่อ UTM zone) แทนการ project ทีละจุดต่อ redline
+    point_xs, point_ys, point_epsgs = project_points_to_utm(points_table['lon'].to_numpy(), points_table['lat'].to_numpy())
+
+    # 3) คำนวณระยะทั้งหมดแบบ bulk (vectorized ทีละ chunk)
+    bulk = compute_bulk_distances(
+        redline_index, point_xs, point_ys, point_epsgs, max_radius_m,
+        progress_callback=(lambda f: report(0.2 + 0.7 * f, "คำนวณระยะ")) if progress_callback else None,
+        workers=analysis_workers, search_radius_m=search_radius_m
+    )
+    redline_names = redline_index['names']
+
+    return {
+        'points_table': points_table,
+        'coord_keys': coord_keys,
+        'point_columns': point_columns,
+        'redline_names': redline_names,
+        'nearest_idx': bulk['nearest_idx'],
+        'nearest_dist': bulk['nearest_dist'],
+        'search_radius_m': search_radius_m,
+        'matrix': build_match_matrix(
+            bulk['match_point'], bulk['match_redline'], bulk['match_dist'], len(points_table), max_radius_m
+        ),
+    }
+
+
+def matches_table_at_threshold(sweep, threshold_m):
+    """
+    ตาราง matches แบบ long-format จาก compute_threshold_sweep ที่ threshold_m (vectorized ไม่สร้าง dict ต่อ match)
+    1 แถวต่อคู่ (จุด, redline): redline, คอลัมน์ของจุด (POINT_COLUMNS), distance_m - เรียงตามจุด แล้วตามลำดับ redline
+    """
+    match_point, match_redline, match_dist = matches_within(sweep['matrix'], threshold_m)
+    # ชื่อ redline อาจซ้ำกันได้ (ไฟล์ชื่อเดียวกันคนละโฟลเดอร์) -> category ใช้ชื่อที่ไม่ซ้ำ
+    categories = list(dict.fromkeys(sweep['redline_names']))
+    name_codes = np.array([categories.index(name) for name in sweep['redline_names']], dtype=np.int64)
+    matches_df = sweep['points_table'].take(match_point).reset_index(drop=True)
+    matches_df.insert(0, 'redline', pd.Categorical.from_codes(name_codes[match_redline], categories=categories))
+    matches_df['distance_m'] = match_dist
+    return matches_df
 
-    for idx, p in enumerate(all_points):
-        lon = float(p['lon'])
-        lat = float(p['lat'])
-        best_dist = float('inf')
-        best_redline = None
-        matched_any = False
-
-        for rl in redline_geoms:
-            dist, epsg_used = point_to_geom_distance_m(lon, lat, rl['geom'], rl['epsg_cache'])
-            if dist < best_dist:
-                best_dist = dist
-                best_redline = rl['name']
-
-            if dist <= threshold_m:
-                matched_any = True
-                rec = {
-                    'group': p.get('group'),
-                    'lat': lat,
-                    'lon': lon,
-                    'ticket': p.get('ticket'),
-                    'sign': p.get('sign'),
-                    'sla': p.get('sla'),
-                    'region': p.get('region'),
-                    'site': p.get('site'),
-                    'online/mobile': p.get('online/mobile'),
-                    'distance_m': dist
-                }
-                redline_matches[rl['name']].append(rec)
-
-        points_results.append({
-            'group': p.get('group'),
-            'lat': lat,
-            'lon': lon,
-            'ticket': p.get('ticket'),
-            'sign': p.get('sign'),
-            'sla': p.get('sla'),
-            'region': p.get('region'),
-            'site': p.get('site'),
-            'online/mobile': p.get('online/mobile'),
-            'nearest_redline': best_redline,
-            'distance_m': best_dist,
-            'matched': matched_any
-        })
 
-        # update progress bar
-        progress_bar.progress((idx + 1) / total_points)
+def summarize_at_threshold(sweep, threshold_m):
+    """
+    สรุปผลจาก compute_threshold_sweep ที่ threshold_m (<= max_radius_m) - กรองอย่างเดียว
+    คืนค่า (points_df, redline_summary) แบบเดียวกับ analyze_points_vs_redlines
+    """
+    points_table = sweep['points_table']
+    coord_keys = sweep['coord_keys']
+    point_columns = sweep['point_columns']
+    redline_names = sweep['redline_names']
+    match_point, match_redline, match_dist = matches_within(sweep['matrix'], threshold_m)
+    matched = np.zeros(len(points_table), dtype=bool)
+    matched[match_point] = True
+
+    # matches อ้างอิงจุดด้วย index ในตาราง: redline_name -> list ของ (point_idx, distance_m)
+    redline_matches = defaultdict(list)
+    for idx, rl_idx, dist in zip(match_point.tolist(), match_redline.tolist(), match_dist.tolist()):
+        redline_matches[redline_names[rl_idx]].append((idx, dist))
 
     # 4) DataFrame & summary
-    points_df = pd.DataFrame(points_results)
+    points_df = points_table.assign(
+        nearest_redline=[redline_names[i] if i >= 0 else None for i in sweep['nearest_idx'].tolist()],
+        distance_m=sweep['nearest_dist'],
+        matched=matched,
+    )
     redline_summary_counts = {}
 
     # สร้าง entry สำหรับทุก redline ล่วงหน้า
-    for rl in redline_geoms:
-        name = rl['name']
+    for name in redline_names:
         redline_summary_counts[name] = {
             'count': 0,
             'count_by_coords': 0,
@@ -154,26 +195,24 @@ def analyze_points_vs_redlines(points_grouped, redlines_files, threshold_m=100):
             'raw_matches': []
         }
 
-    # เติมข้อมูลจาก matched points
-    for name, matches in redline_matches.items():
+    # เติมข้อมูลจาก matched points (สร้าง record ต่อ match เฉพาะตอนสรุปผล)
+    for name, match_refs in redline_matches.items():
+        matches = []
         seen_coords = set()
         unique_by_coords = []
-        for r in matches:
-            coord_key = (round(r.get('lat', 0), 6), round(r.get('lon', 0), 6))
+        seen_full = set()
+        unique_by_full = []
+        for idx, dist in match_refs:
+            r = {col: point_columns[col][idx] for col in POINT_COLUMNS}
+            r['distance_m'] = dist
+            matches.append(r)
+
+            coord_key = coord_keys[idx]
             if coord_key not in seen_coords:
                 seen_coords.add(coord_key)
                 unique_by_coords.append(r)
 
-        seen_full = set()
-        unique_by_full = []
-        for r in matches:
-            full_key = (
-                r.get('ticket'),
-                round(r.get('lat', 0), 6),
-                round(r.get('lon', 0), 6),
-                r.get('site'),
-                r.get('sign')
-            )
+            full_key = (r['ticket'], coord_key[0], coord_key[1], r['site'], r['sign'])
             if full_key not in seen_full:
                 seen_full.add(full_key)
                 unique_by_full.append(r)
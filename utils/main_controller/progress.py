@@ -0,0 +1,34 @@
+import time
+
+# ค่า default: อัปเดตไม่เกิน ~4 ครั้ง/วินาที และต้องขยับอย่างน้อย 1%
+DEFAULT_MIN_INTERVAL_S = 0.25
+DEFAULT_MIN_STEP = 0.01
+
+
+def _no_progress(fraction, text=None):
+    pass
+
+
+def throttle_progress(callback, min_interval_s=DEFAULT_MIN_INTERVAL_S, min_step=DEFAULT_MIN_STEP):
+    """
+    ห่อ progress callback ให้ส่งต่อเฉพาะเมื่อเวลาผ่านไปอย่างน้อย min_interval_s
+    และค่าขยับอย่างน้อย min_step (หรือเปลี่ยนข้อความ stage / ถึง 100%)
+    callback(fraction, text) - เช่น st.progress(...).progress ของ Streamlit
+    ถ้า callback เป็น None จะคืนฟังก์ชันว่าง (ไม่มีใครดู = ไม่มี overhead)
+    """
+    if callback is None:
+        return _no_progress
+    state = {'time': float('-inf'), 'fraction': float('-inf'), 'text': None}
+
+    def report(fraction, text=None):
+        now = time.monotonic()
+        if not (
+            fraction >= 1.0
+            or text != state['text']
+            or (now - state['time'] >= min_interval_s and fraction - state['fraction'] >= min_step)
+        ):
+            return
+        state.update(time=now, fraction=fraction, text=text)
+        callback(min(max(fraction, 0.0), 1.0), text)
+
+    return report
@@ -0,0 +1,66 @@
+import os
+import io
+import zipfile
+import logging
+from contextlib import contextmanager
+
+_ZIP_MAGIC = b'PK\x03\x04'
+
+def source_name(source):
+    """ชื่อของ source สำหรับใช้ใน log (path หรือชื่อไฟล์ที่อัปโหลด)"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.fspath(source)
+    return getattr(source, 'name', None) or '<memory>'
+
+def source_exists(source):
+    """ตรวจว่ามี source อยู่จริงไหม (เช็คเฉพาะ path, buffer ถือว่ามีเสมอ)"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.exists(source)
+    return source is not None
+
+def _pick_kml_member(zf):
+    """เลือกไฟล์ KML หลักใน KMZ: doc.kml ถ้ามี ไม่งั้นใช้ .kml ไฟล์แรก"""
+    names = [n for n in zf.namelist() if n.lower().endswith('.kml')]
+    if not names:
+        return None
+    for n in names:
+        if n.lower() == 'doc.kml':
+            return n
+    return names[0]
+
+@contextmanager
+def open_kml_stream(source):
+    """
+    เปิด KML/KMZ เป็น binary stream สำหรับ iterparse
+    source: path (.kml/.kmz), bytes หรือ file-like (เช่น UploadedFile ของ Streamlit)
+    - KMZ ตรวจจาก magic bytes ของ zip และอ่าน doc.kml ออกจาก archive แบบ stream (ไม่แตกไฟล์ลง disk)
+    yield None ถ้าใน KMZ ไม่มีไฟล์ .kml
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        fileobj = io.BytesIO(source)
+        close_fileobj = True
+    elif isinstance(source, (str, os.PathLike)):
+        fileobj = open(source, 'rb')
+        close_fileobj = True
+    else:
+        fileobj = source
+        fileobj.seek(0)
+        close_fileobj = False
+
+    try:
+        magic = fileobj.read(len(_ZIP_MAGIC))
+        fileobj.seek(0)
+        if magic != _ZIP_MAGIC:
+            yield fileobj
+            return
+        with zipfile.ZipFile(fileobj) as zf:
+            member = _pick_kml_member(zf)
+            if member is None:
+                logging.warning("ไม่พบไฟล์ .kml ใน KMZ: %s", source_name(source))
+                yield None
+                return
+            with zf.open(member) as member_stream:
+                yield member_stream
+    finally:
+        if close_fileobj:
+            fileobj.close()
@@ -1,11 +1,13 @@
 import os
 import logging
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
 from tqdm import tqdm
 
 import pandas as pd
 import xml.etree.ElementTree as ET
 
+import shapely
 from shapely.geometry import LineString, Point, MultiLineString, GeometryCollection
 from shapely.ops import unary_union, transform
 
@@ -15,22 +17,33 @@ from openpyxl.utils import get_column_letter
 from pyproj import CRS, Transformer
 from datetime import datetime
 
+from .kml_source import open_kml_stream, source_exists, source_name
+
 ns = {'kml': 'http://www.opengis.net/kml/2.2'}
 
-def parse_kml_lines(filename):
-    """อ่านเส้น (LineString) หลายๆ placemark และ return geometry (LineString / MultiLineString)"""
-    if not os.path.exists(filename):
+_PLACEMARK_TAG = '{%s}Placemark' % ns['kml']
+
+def parse_kml_lines(source):
+    """
+    อ่านเส้น (LineString) หลายๆ placemark และ return geometry (LineString / MultiLineString)
+    source: path (.kml/.kmz), bytes หรือ file-like - อ่านแบบ iterparse ทีละ placemark
+    """
+    filename = source_name(source)
+    if not source_exists(source):
         logging.warning("ไม่พบไฟล์ lines: %s", filename)
         return None
 
-    tree = ET.parse(filename)
-    root = tree.getroot()
     line_list = []
-
-    for i, placemark in enumerate(root.findall('.//kml:Placemark', ns), start=1):
-        coords_elem = placemark.find('.//kml:coordinates', ns)
-        if coords_elem is not None and coords_elem.text:
-            coord_text = coords_elem.text.strip()
+    with open_kml_stream(source) as stream:
+        if stream is None:
+            return None
+        placemarks = (elem for _, elem in ET.iterparse(stream) if elem.tag == _PLACEMARK_TAG)
+        for i, placemark in enumerate(placemarks, start=1):
+            coords_elem = placemark.find('.//kml:coordinates', ns)
+            coord_text = coords_elem.text.strip() if coords_elem is not None and coords_elem.text else None
+            placemark.clear()
+            if not coord_text:
+                continue
             try:
                 coord_pairs = [tuple(map(float, coord.split(',')[:2])) for coord in coord_text.strip().split()]
             except Exception:
@@ -45,4 +58,39 @@ def parse_kml_lines(filename):
         return None
     if len(line_list) == 1:
         return line_list[0]
-    return unary_union(line_list)  # อาจได้ MultiLineString
\ No newline at end of file
+    return unary_union(line_list)  # อาจได้ MultiLineString
+
+
+def _parse_kml_lines_wkb(filename):
+    """(ทำงานใน worker) parse เส้นแล้วคืน (WKB หรือ None, ข้อความ error หรือ None)"""
+    try:
+        geom = parse_kml_lines(filename)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    return (shapely.to_wkb(geom) if geom is not None else None), None
+
+def parse_kml_lines_parallel(filenames, max_workers=None):
+    """
+    parse redline หลายไฟล์พร้อมกันด้วย process pool → list ของ geometry ตามลำดับ filenames
+    - ส่งผลกลับจาก worker เป็น WKB (เล็กและ pickle เร็ว)
+    - ไฟล์ที่ไม่มีเส้นหรือ parse ไม่ได้จะได้ None (log warning แล้วข้าม ไม่ทำให้ไฟล์อื่นล้ม)
+    max_workers: จำนวน process (None = จำนวน CPU, 1 = ทำใน process เดิม)
+    """
+    filenames = list(filenames)
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+    max_workers = max(1, min(max_workers, len(filenames)))
+
+    if max_workers == 1:
+        results = [_parse_kml_lines_wkb(f) for f in filenames]
+    else:
+        chunksize = max(1, len(filenames) // (max_workers * 4))
+        with ProcessPoolExecutor(max_workers=max_workers) as pool:
+            results = list(pool.map(_parse_kml_lines_wkb, filenames, chunksize=chunksize))
+
+    geoms = []
+    for filename, (wkb, error) in zip(filenames, results):
+        if error is not None:
+            logging.warning("อ่านไฟล์ lines %s ไม่สำเร็จ: %s - ข้าม", filename, error)
+        geoms.append(shapely.from_wkb(wkb) if wkb is not None else None)
+    return geoms
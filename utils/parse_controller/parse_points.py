@@ -2,40 +2,81 @@ import os
 import xml.etree.ElementTree as ET
 import logging
 
+from .kml_source import open_kml_stream, source_exists, source_name
+
 ns = {'kml': 'http://www.opengis.net/kml/2.2'}
+_PLACEMARK_TAG = '{%s}Placemark' % ns['kml']
+
+DEFAULT_BATCH_SIZE = 10000
+
+def _placemark_to_point(placemark, filename):
+    """แปลง Placemark element -> dict ของจุด (None ถ้าไม่มีพิกัด Point)"""
+    ext_data = {}
+    for sd in placemark.findall('.//kml:ExtendedData//kml:SimpleData', ns):
+        name = sd.attrib.get('name')
+        val = sd.text
+        ext_data[name] = val
+
+    coord_elem = placemark.find('.//kml:Point/kml:coordinates', ns)
+    if coord_elem is None or not coord_elem.text:
+        return None
+    coords = coord_elem.text.strip()
+    try:
+        lon, lat, *_ = map(float, coords.split(','))
+    except Exception:
+        logging.warning("ไม่สามารถอ่านพิกัดจาก placemark ใน %s", filename)
+        return None
+    return {
+        'lat': lat,
+        'lon': lon,
+        'ticket': ext_data.get('TICKET', None) or ext_data.get('Ticket', None) or 'N/A',
+        'sign': ext_data.get('Sign', None) or 'N/A',
+        'sla': ext_data.get('SLA', None) or 'N/A',
+        'region': ext_data.get('Region', None) or 'N/A',
+        'site': ext_data.get('Site', None) or 'N/A',
+        'online/mobile': ext_data.get('Online___Mobile', None) or 'N/A',
+    }
 
-def parse_kml_points(filename):
-    """อ่านจุดจาก KML → คืนค่า list ของ dict {'lat','lon','ticket','sign'}"""
-    if not os.path.exists(filename):
-        logging.warning("ไม่พบไฟล์ points: %s", filename)
-        return []
-    tree = ET.parse(filename)
-    root = tree.getroot()
-    points = []
-
-    for placemark in root.findall('.//kml:Placemark', ns):
-        ext_data = {}
-        for sd in placemark.findall('.//kml:ExtendedData//kml:SimpleData', ns):
-            name = sd.attrib.get('name')
-            val = sd.text
-            ext_data[name] = val
-
-        coord_elem = placemark.find('.//kml:Point/kml:coordinates', ns)
-        if coord_elem is not None and coord_elem.text:
-            coords = coord_elem.text.strip()
-            try:
-                lon, lat, *_ = map(float, coords.split(','))
-            except Exception:
-                logging.warning("ไม่สามารถอ่านพิกัดจาก placemark ใน %s", filename)
+def iter_kml_points(source):
+    """
+    อ่านจุดจาก KML/KMZ แบบ streaming (iterparse) → yield dict ทีละ placemark
+    - source: path (.kml/.kmz), bytes หรือ file-like
+    - ลบ Placemark ที่อ่านแล้วออกจาก tree ทันที ทำให้ memory คงที่ไม่ว่าไฟล์จะใหญ่แค่ไหน
+    """
+    if not source_exists(source):
+        logging.warning("ไม่พบไฟล์ points: %s", source_name(source))
+        return
+    filename = source_name(source)
+    with open_kml_stream(source) as stream:
+        if stream is None:
+            return
+        parents = []
+        for event, elem in ET.iterparse(stream, events=('start', 'end')):
+            if event == 'start':
+                parents.append(elem)
                 continue
-            points.append({
-                'lat': lat,
-                'lon': lon,
-                'ticket': ext_data.get('TICKET', None) or ext_data.get('Ticket', None) or 'N/A',
-                'sign': ext_data.get('Sign', None) or 'N/A',
-                'sla': ext_data.get('SLA', None) or 'N/A',
-                'region': ext_data.get('Region', None) or 'N/A',
-                'site': ext_data.get('Site', None) or 'N/A',
-                'online/mobile': ext_data.get('Online___Mobile', None) or 'N/A',
-            })
-    return points
\ No newline at end of file
+            parents.pop()
+            if elem.tag != _PLACEMARK_TAG:
+                continue
+            point = _placemark_to_point(elem, filename)
+            # ตัด placemark ที่ใช้แล้วออกจาก parent เพื่อไม่ให้ tree โตตามไฟล์
+            elem.clear()
+            if parents:
+                parents[-1].remove(elem)
+            if point is not None:
+                yield point
+
+def iter_kml_point_batches(source, batch_size=DEFAULT_BATCH_SIZE):
+    """อ่านจุดจาก KML/KMZ แบบ streaming → yield list ของ dict ทีละ batch (ขนาดไม่เกิน batch_size)"""
+    batch = []
+    for point in iter_kml_points(source):
+        batch.append(point)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+def parse_kml_points(source):
+    """อ่านจุดจาก KML/KMZ → คืนค่า list ของ dict {'lat','lon','ticket','sign'}"""
+    return list(iter_kml_points(source))
@@ -0,0 +1,63 @@
+import logging
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from .kml_source import source_name
+from .parse_points import iter_kml_point_batches, DEFAULT_BATCH_SIZE
+
+# ฟิลด์ข้อความของแต่ละจุด (เก็บแบบ dictionary-encoded / category)
+POINT_FIELDS = ['ticket', 'sign', 'sla', 'region', 'site', 'online/mobile']
+POINT_COLUMNS = ['group', 'lat', 'lon'] + POINT_FIELDS
+
+
+def _new_encoder():
+    """ตัวเข้ารหัสข้อความเป็น int code (ค่าซ้ำกันเก็บข้อความครั้งเดียว)"""
+    return {'codes': array('i'), 'categories': {}}
+
+
+def _encode(encoder, value):
+    code = encoder['categories'].get(value)
+    if code is None:
+        code = encoder['categories'][value] = len(encoder['categories'])
+    encoder['codes'].append(code)
+
+
+def _to_categorical(encoder):
+    return pd.Categorical.from_codes(
+        np.array(encoder['codes'], dtype=np.int32),
+        categories=list(encoder['categories']),
+    )
+
+
+def read_point_table(points_grouped, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    อ่านจุดจากทุกกลุ่มแบบ streaming → ตารางแบบ columnar (pandas.DataFrame)
+    - lat/lon เป็น float64, group และ POINT_FIELDS เป็น category (ไม่มี dict ต่อจุด)
+    - ลำดับแถว = ลำดับกลุ่มใน points_grouped แล้วตามลำดับในไฟล์ (index 0..n-1 ใช้อ้างอิงจุด)
+    points_grouped: dict mapping group_name -> filepath (kml/kmz) หรือ bytes / file-like
+    """
+    lats = array('d')
+    lons = array('d')
+    encoders = {col: _new_encoder() for col in ['group'] + POINT_FIELDS}
+
+    for group_name, source in points_grouped.items():
+        count = 0
+        for batch in iter_kml_point_batches(source, batch_size):
+            for p in batch:
+                lats.append(p['lat'])
+                lons.append(p['lon'])
+                _encode(encoders['group'], group_name)
+                for field in POINT_FIELDS:
+                    _encode(encoders[field], p[field])
+            count += len(batch)
+        if count:
+            logging.info("อ่าน %s -> %d จุด", group_name, count)
+        else:
+            logging.info("ไฟล์ %s - ไม่มีจุดหรือไม่พบ", source_name(source))
+
+    columns = {col: _to_categorical(encoder) for col, encoder in encoders.items()}
+    columns['lat'] = np.array(lats, dtype=np.float64)
+    columns['lon'] = np.array(lons, dtype=np.float64)
+    return pd.DataFrame({col: columns[col] for col in POINT_COLUMNS})
@@ -0,0 +1,186 @@
+import json
+import math
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+from ..geom_controller.geom import project_points_to_utm
+from ..geom_controller.redline_index import get_zone_index, query_redlines_near_point
+from ..geom_controller.bulk_distance import compute_bulk_distances
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_QUERY_THRESHOLD_M = 111
+# จำกัด threshold / ขนาด batch ต่อ request ไม่ให้ query เดียวกินเครื่องทั้งเครื่อง
+MAX_QUERY_THRESHOLD_M = 10000
+MAX_BATCH_POINTS = 100000
+
+# สร้าง zone ใหม่ (นอก UTM 47/48) ได้ทีละ thread
+_zone_lock = threading.Lock()
+
+
+def _ensure_zones(index, epsgs):
+    for epsg in set(int(e) for e in epsgs):
+        if epsg not in index['zones']:
+            with _zone_lock:
+                get_zone_index(index, epsg)
+
+
+def _check_point(lat, lon):
+    if not (math.isfinite(lat) and math.isfinite(lon) and -90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError(f"พิกัดไม่ถูกต้อง: lat={lat}, lon={lon}")
+
+
+def _check_threshold(threshold_m, search_radius_m=None):
+    if not (0 <= threshold_m <= MAX_QUERY_THRESHOLD_M):
+        raise ValueError(f"threshold_m ต้องอยู่ระหว่าง 0 ถึง {MAX_QUERY_THRESHOLD_M}")
+    if search_radius_m is not None and not (threshold_m <= search_radius_m):
+        raise ValueError("search_radius_m ต้องไม่น้อยกว่า threshold_m")
+
+
+def _result(index, lat, lon, nearest_idx, nearest_dist, matches):
+    names = index['names']
+    found = nearest_idx is not None and nearest_idx >= 0
+    return {
+        'lat': lat,
+        'lon': lon,
+        'nearest_redline': names[nearest_idx] if found else None,
+        'distance_m': nearest_dist if found else None,
+        'within': [{'redline': names[rl_idx], 'distance_m': dist} for rl_idx, dist in matches],
+    }
+
+
+def query_nearest(index, lat, lon, threshold_m=DEFAULT_QUERY_THRESHOLD_M, search_radius_m=None):
+    """
+    redline ที่ใกล้จุด (lat, lon) ที่สุด + ทุกเส้นที่อยู่ภายใน threshold_m
+    search_radius_m: หา nearest เฉพาะภายในระยะนี้ (ไม่มี -> nearest_redline / distance_m เป็น null), None = ไม่จำกัด
+    คืนค่า dict {'lat','lon','nearest_redline','distance_m','within': [{'redline','distance_m'}, ...]}
+    """
+    _check_point(lat, lon)
+    _check_threshold(threshold_m, search_radius_m)
+    xs, ys, epsgs = project_points_to_utm([lon], [lat])
+    _ensure_zones(index, epsgs)
+    nearest_idx, nearest_dist, matches = query_redlines_near_point(
+        index, int(epsgs[0]), xs[0], ys[0], threshold_m, search_radius_m
+    )
+    return _result(index, lat, lon, nearest_idx, nearest_dist, matches)
+
+
+def query_nearest_batch(index, lats, lons, threshold_m=DEFAULT_QUERY_THRESHOLD_M, search_radius_m=None):
+    """เหมือน query_nearest แต่หลายจุดพร้อมกัน (vectorized ด้วย compute_bulk_distances) -> list ตามลำดับจุด"""
+    if len(lats) > MAX_BATCH_POINTS:
+        raise ValueError(f"batch ใหญ่เกินไป ({len(lats)} จุด, สูงสุด {MAX_BATCH_POINTS})")
+    for lat, lon in zip(lats, lons):
+        _check_point(lat, lon)
+    _check_threshold(threshold_m, search_radius_m)
+    xs, ys, epsgs = project_points_to_utm(lons, lats)
+    _ensure_zones(index, epsgs)
+    bulk = compute_bulk_distances(index, xs, ys, epsgs, threshold_m, search_radius_m=search_radius_m)
+
+    bounds = np.searchsorted(bulk['match_point'], np.arange(len(lats) + 1))
+    match_redline = bulk['match_redline'].tolist()
+    match_dist = bulk['match_dist'].tolist()
+    return [
+        _result(index, lat, lon, nearest_idx, nearest_dist,
+                zip(match_redline[bounds[i]:bounds[i + 1]], match_dist[bounds[i]:bounds[i + 1]]))
+        for i, (lat, lon, nearest_idx, nearest_dist) in enumerate(zip(
+            lats, lons, bulk['nearest_idx'].tolist(), bulk['nearest_dist'].tolist()
+        ))
+    ]
+
+
+class NearestRedlineHandler(BaseHTTPRequestHandler):
+    """
+    GET  /health                                   -> จำนวน redline / segment และ fingerprint ของชุด redlines
+    GET  /nearest?lat=..&lon=..[&threshold_m=..][&search_radius_m=..]   -> ผลของจุดเดียว (ดู query_nearest)
+    POST /nearest/batch  {"points": [[lat, lon], ...] หรือ [{"lat":..,"lon":..}, ...], "threshold_m": .., "search_radius_m": ..}
+                                                   -> {"results": [...]}
+    """
+    # keep-alive: client ส่งหลาย request ใน connection เดียว (ไม่ต้องเปิด TCP ใหม่ทุกครั้ง)
+    protocol_version = "HTTP/1.1"
+    # header กับ body ส่งแยกกัน 2 ครั้ง -> ถ้าไม่ปิด Nagle จะรอ delayed ACK ของ client ~40 ms ทุก response
+    disable_nagle_algorithm = True
+    # redline catalog (ดู create_redline_catalog) - อ่าน catalog['index'] ใหม่ทุก request จึงเห็นเส้นที่ reload แล้วทันที
+    catalog = None
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        index = self.catalog['index']
+        if index is None:
+            self._send_json(503, {'error': "ไม่มี redlines ที่ใช้งานได้"})
+            return
+        if url.path == "/health":
+            self._send_json(200, {
+                'redlines': len(index['names']),
+                'segments': {str(epsg): len(zone['segments']) for epsg, zone in index['zones'].items()},
+                'fingerprint': index.get('fingerprint'),
+                'version': self.catalog.get('version'),
+                'updated_at': self.catalog.get('updated_at'),
+            })
+            return
+        if url.path != "/nearest":
+            self._send_json(404, {'error': f"ไม่พบ path {url.path}"})
+            return
+        params = parse_qs(url.query)
+        try:
+            lat = float(params['lat'][0])
+            lon = float(params['lon'][0])
+            threshold_m = float(params.get('threshold_m', [DEFAULT_QUERY_THRESHOLD_M])[0])
+            search_radius_m = float(params['search_radius_m'][0]) if 'search_radius_m' in params else None
+            result = query_nearest(index, lat, lon, threshold_m, search_radius_m)
+        except (KeyError, ValueError) as e:
+            self._send_json(400, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, result)
+
+    def do_POST(self):
+        if urlparse(self.path).path != "/nearest/batch":
+            self._send_json(404, {'error': f"ไม่พบ path {self.path}"})
+            return
+        index = self.catalog['index']
+        if index is None:
+            self._send_json(503, {'error': "ไม่มี redlines ที่ใช้งานได้"})
+            return
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            points = body['points']
+            if points and isinstance(points[0], dict):
+                lats = [float(p['lat']) for p in points]
+                lons = [float(p['lon']) for p in points]
+            else:
+                lats = [float(p[0]) for p in points]
+                lons = [float(p[1]) for p in points]
+            threshold_m = float(body.get('threshold_m', DEFAULT_QUERY_THRESHOLD_M))
+            search_radius_m = body.get('search_radius_m')
+            search_radius_m = float(search_radius_m) if search_radius_m is not None else None
+            results = query_nearest_batch(index, lats, lons, threshold_m, search_radius_m)
+        except (KeyError, IndexError, TypeError, ValueError) as e:
+            self._send_json(400, {'error': f"{type(e).__name__}: {e}"})
+            return
+        self._send_json(200, {'results': results})
+
+    def log_message(self, format, *args):
+        # access log ทุก request ทำให้ช้า -> เก็บไว้ระดับ debug
+        logging.debug("%s - %s", self.address_string(), format % args)
+
+
+def make_server(catalog, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """
+    สร้าง HTTP server (thread ต่อ connection) ที่ใช้ index ของ catalog ร่วมกันแบบอ่านอย่างเดียว
+    catalog: dict ที่มี 'index' (เช่นจาก create_redline_catalog ซึ่ง watcher สลับ index ใหม่ให้เอง)
+    """
+    handler = type("BoundNearestRedlineHandler", (NearestRedlineHandler,), {'catalog': catalog})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server